@@ -27,6 +27,16 @@ class AstPrinter(stmt.Visitor, expr.Visitor):
         s += ")"
         return s
 
+    def visit_if_stmt(self, stmt: stmt.If) -> str:
+        if stmt.else_branch is None:
+            return self._parenthesize2("if", stmt.condition, stmt.then_branch)
+        return self._parenthesize2(
+            "if-else", stmt.condition, stmt.then_branch, stmt.else_branch
+        )
+
+    def visit_while_stmt(self, stmt: stmt.While) -> str:
+        return self._parenthesize2("while", stmt.condition, stmt.body)
+
     def visit_var_stmt(self, stmt: stmt.Var) -> str:
         if stmt.initializer is None:
             return self._parenthesize2("var", stmt.name)
@@ -35,6 +45,9 @@ class AstPrinter(stmt.Visitor, expr.Visitor):
     def visit_binary_expr(self, expr: expr.Binary) -> str:
         return self._parenthesize(expr.operator.lexeme, expr.left, expr.right)
 
+    def visit_logical_expr(self, expr: expr.Logical) -> str:
+        return self._parenthesize(expr.operator.lexeme, expr.left, expr.right)
+
     def visit_grouping_expr(self, expr: expr.Grouping) -> str:
         return self._parenthesize("group", expr.expression)
 
@@ -0,0 +1,112 @@
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+from lox import ENGINES, SCANNERS, Lox
+
+engine: type | None = None
+
+
+def discover(paths: List[str], manifest: str | None) -> Iterator[str]:
+    for path in map(Path, paths):
+        if path.is_dir():
+            yield from (str(p) for p in sorted(path.rglob("*.lox")))
+        else:
+            yield str(path)
+    if manifest is not None:
+        with open(manifest) as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    yield line
+
+
+def init_worker(engine_name: str, scanner: str, optimize: bool):
+    # runs once per worker, imports and configuration are paid only here
+    global engine
+    engine = ENGINES[engine_name]
+    Lox.scanner = SCANNERS[scanner]
+    Lox.optimize = optimize
+
+
+def run_script(path: str) -> Dict:
+    # a fresh interpreter per script so globals never leak between scripts
+    Lox.reset()
+    Lox.interpreter = engine()
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    exit_code = 0
+    status = "ok"
+    start = time.perf_counter()
+    with redirect_stdout(stdout), redirect_stderr(stderr):
+        try:
+            Lox.run_file(path)
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else 1
+        except Exception:
+            traceback.print_exc()
+            exit_code = 1
+            status = "crash"
+    elapsed = time.perf_counter() - start
+
+    if status != "crash":
+        if Lox.has_error:
+            status = "compile_error"
+        elif Lox.has_runtime_error:
+            status = "runtime_error"
+    return {
+        "path": path,
+        "status": status,
+        "exit_code": exit_code,
+        "stdout": stdout.getvalue(),
+        "stderr": stderr.getvalue(),
+        "elapsed": elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run many Lox scripts on a pool of warm worker processes, "
+        "printing one json result per line."
+    )
+    parser.add_argument("paths", nargs="*", help="scripts or directories of scripts")
+    parser.add_argument("--manifest", help="file listing one script path per line")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count())
+    parser.add_argument("--engine", choices=ENGINES.keys(), default="tree")
+    parser.add_argument("--scanner", choices=SCANNERS.keys(), default="classic")
+    parser.add_argument("-O", "--optimize", action="store_true")
+    parser.add_argument(
+        "--ordered",
+        action="store_true",
+        help="emit results in input order instead of as they complete",
+    )
+    args = parser.parse_args()
+    if not args.paths and args.manifest is None:
+        parser.error("give scripts, directories or --manifest")
+
+    scripts = discover(args.paths, args.manifest)
+    failed = 0
+    with multiprocessing.Pool(
+        args.jobs,
+        initializer=init_worker,
+        initargs=(args.engine, args.scanner, args.optimize),
+    ) as pool:
+        mapper = pool.imap if args.ordered else pool.imap_unordered
+        for result in mapper(run_script, scripts, chunksize=8):
+            if result["status"] != "ok":
+                failed += 1
+            sys.stdout.write(json.dumps(result) + "\n")
+            sys.stdout.flush()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
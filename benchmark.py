@@ -0,0 +1,273 @@
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stderr
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent
+DEFAULT_CORPUS = ROOT / "test" / "benchmark"
+PHASES = ["scan", "parse", "resolve", "optimize", "execute"]
+
+
+def discover(paths: List[str]) -> List[Path]:
+    scripts = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            scripts.extend(sorted(path.rglob("*.lox")))
+        else:
+            scripts.append(path)
+    return scripts
+
+
+def run_child(
+    script: str, engine: str, scanner: str, parser: str, optimize: bool, report: str
+):
+    # runs inside a fresh process, times every phase of Lox.run separately
+    sys.path.insert(0, str(ROOT))
+    from lox import ENGINES, PARSERS, SCANNERS, Lox, Optimizer, Resolver
+
+    Lox.interpreter = ENGINES[engine]()
+    Lox.scanner = SCANNERS[scanner]
+    Lox.parser = PARSERS[parser]
+    Lox.optimize = optimize
+    timings = {}
+    exit_code = 0
+
+    source = open(script, "r").read()
+    start = time.perf_counter()
+    tokens = Lox.scanner(source.strip()).scan_tokens()
+    timings["scan"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    statements = Lox.parser(tokens).parse()
+    timings["parse"] = time.perf_counter() - start
+
+    if not Lox.has_error:
+        start = time.perf_counter()
+        Resolver().resolve(statements)
+        timings["resolve"] = time.perf_counter() - start
+
+    if Lox.optimize and not Lox.has_error:
+        start = time.perf_counter()
+        statements = Optimizer().optimize(statements)
+        timings["optimize"] = time.perf_counter() - start
+
+    if not Lox.has_error:
+        start = time.perf_counter()
+        Lox.interpreter.interpret(statements)
+        Lox.interpreter.output.flush()
+        timings["execute"] = time.perf_counter() - start
+
+    if Lox.has_error:
+        exit_code = 65
+    with open(report, "w") as f:
+        json.dump({"phases": timings, "exit_code": exit_code}, f)
+    sys.exit(exit_code)
+
+
+def run_once(
+    script: Path, engine: str, scanner: str, parser: str, optimize: bool
+) -> Dict:
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        report = f.name
+    try:
+        command = [
+            sys.executable,
+            str(Path(__file__).resolve()),
+            "--child",
+            str(script),
+            "--engine",
+            engine,
+            "--scanner",
+            scanner,
+            "--parser",
+            parser,
+            "--report",
+            report,
+        ]
+        if optimize:
+            command.append("--optimize")
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        # wait4 gives the rusage of this child alone, ru_maxrss is in KiB on linux
+        _, status, rusage = os.wait4(process.pid, 0)
+        wall = time.perf_counter() - start
+        process.returncode = os.waitstatus_to_exitcode(status)
+
+        phases = {}
+        if os.path.getsize(report) > 0:
+            with open(report) as f:
+                phases = json.load(f)["phases"]
+        return {
+            "wall": wall,
+            "max_rss_kb": rusage.ru_maxrss,
+            "phases": phases,
+            "exit_code": process.returncode,
+        }
+    finally:
+        os.unlink(report)
+
+
+def parser_throughput(scripts: List[Path], runs: int) -> Dict:
+    # in process: every script is scanned once and the same tokens are fed to
+    # each parser, so only parsing is timed
+    sys.path.insert(0, str(ROOT))
+    from lox import PARSERS, Lox
+
+    sources = [open(script, "r").read() for script in scripts]
+    with redirect_stderr(io.StringIO()):
+        token_lists = [Lox.scan(source) for source in sources]
+    total = sum(len(tokens) for tokens in token_lists)
+    results = {}
+    print(f"{len(scripts)} scripts, {total} tokens, best of {runs}")
+    for name, parser in PARSERS.items():
+        best = None
+        # scripts with syntax errors are parsed too, keep their reports quiet
+        with redirect_stderr(io.StringIO()):
+            for _ in range(runs):
+                start = time.perf_counter()
+                for tokens in token_lists:
+                    parser(tokens).parse()
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+        Lox.reset()
+        results[name] = {"seconds": best, "tokens_per_second": total / best}
+        print(f"{name:<12} {best:.3f}s {total / best:>12,.0f} tokens/s")
+    return {"tokens": total, "parsers": results}
+
+
+def summarize(runs: List[Dict]) -> Dict:
+    walls = [run["wall"] for run in runs]
+    phases = {}
+    for phase in PHASES:
+        values = [run["phases"][phase] for run in runs if phase in run["phases"]]
+        if values:
+            phases[phase] = statistics.median(values)
+    return {
+        "wall": {
+            "min": min(walls),
+            "median": statistics.median(walls),
+            "mean": statistics.mean(walls),
+            "stdev": statistics.stdev(walls) if len(walls) > 1 else 0.0,
+        },
+        "max_rss_kb": max(run["max_rss_kb"] for run in runs),
+        "phases": phases,
+        "exit_code": runs[-1]["exit_code"],
+    }
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    regressions = []
+    print(f"\n{'benchmark':<40} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, current in results["benchmarks"].items():
+        previous = baseline["benchmarks"].get(name)
+        if previous is None:
+            print(f"{name:<40} {'-':>10} {current['wall']['median']:>9.3f}s {'new':>8}")
+            continue
+        before = previous["wall"]["median"]
+        after = current["wall"]["median"]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<40} {before:>9.3f}s {after:>9.3f}s {change:>+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run Lox benchmark scripts in fresh processes."
+    )
+    parser.add_argument("paths", nargs="*", default=[str(DEFAULT_CORPUS)])
+    parser.add_argument("-n", "--runs", type=int, default=5)
+    parser.add_argument("--engine", default="tree")
+    parser.add_argument("--scanner", default="classic")
+    parser.add_argument("--parser", default="recursive")
+    parser.add_argument(
+        "-O", "--optimize", action="store_true", help="run the optimizer as lox -O does"
+    )
+    parser.add_argument("-o", "--output", help="write results as json")
+    parser.add_argument("--baseline", help="json results to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="relative slowdown of the median wall time reported as a regression",
+    )
+    parser.add_argument(
+        "--parse",
+        action="store_true",
+        help="measure parser throughput in tokens per second instead",
+    )
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--report", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(
+            args.child,
+            args.engine,
+            args.scanner,
+            args.parser,
+            args.optimize,
+            args.report,
+        )
+
+    if args.parse:
+        results = parser_throughput(discover(args.paths), args.runs)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+        return
+
+    results = {
+        "engine": args.engine,
+        "scanner": args.scanner,
+        "parser": args.parser,
+        "optimize": args.optimize,
+        "runs": args.runs,
+        "python": platform.python_version(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "benchmarks": {},
+    }
+    for script in discover(args.paths):
+        name = os.path.relpath(script, ROOT)
+        runs = [
+            run_once(script, args.engine, args.scanner, args.parser, args.optimize)
+            for _ in range(args.runs)
+        ]
+        summary = summarize(runs)
+        results["benchmarks"][name] = summary
+        status = "" if summary["exit_code"] == 0 else f" (exit {summary['exit_code']})"
+        phases = " ".join(f"{k}={v:.3f}s" for k, v in summary["phases"].items())
+        print(
+            f"{name:<40} {summary['wall']['median']:.3f}s "
+            f"rss={summary['max_rss_kb']}KiB {phases}{status}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import argparse
+import hashlib
+import os
+import pickle
+import platform
+import sys
+import tempfile
+from dataclasses import fields
+from dataclasses import is_dataclass
+from pathlib import Path
+from typing import List
+from typing import Tuple
+
+import expr
+import stmt
+from lox import VERSION
+from token_type import TokenType
+from tokens import Token
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def layout() -> str:
+    # the fields of every class a cached program pickles, and the token types
+    # its tokens refer to by name
+    classes = [Token]
+    for module in (expr, stmt):
+        classes.extend(
+            cls
+            for cls in vars(module).values()
+            if is_dataclass(cls) and cls.__module__ == module.__name__
+        )
+    parts = [
+        f"{cls.__qualname__}({','.join(field.name for field in fields(cls))})"
+        for cls in classes
+    ]
+    parts.append(",".join(token_type.name for token_type in TokenType))
+    return ";".join(parts)
+
+
+# part of every key, entries pickled with another node layout are never read
+FORMAT = hashlib.sha256(layout().encode()).hexdigest()[:16]
+
+
+def intern_strings(statements: List[stmt.Stmt]):
+    # unpickled strings are new objects, intern the names and literals again
+    # as the scanner does. walked without recursion, cached trees can be deep
+    pending: list = list(statements)
+    while pending:
+        node = pending.pop()
+        for field in fields(node):
+            value = getattr(node, field.name)
+            if type(value) is str:
+                setattr(node, field.name, sys.intern(value))
+            elif type(value) is list:
+                pending.extend(value)
+            elif is_dataclass(value):
+                pending.append(value)
+
+
+def default_directory() -> Path:
+    if "LOX_CACHE_DIR" in os.environ:
+        return Path(os.environ["LOX_CACHE_DIR"])
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "lox"
+
+
+class ProgramCache:
+    # pickled statement lists keyed by source hash, least recently used
+    # entries (by mtime, refreshed on every hit) are evicted past max_bytes
+    directory: Path
+    max_bytes: int
+
+    def __init__(self, directory: Path | None = None, max_bytes: int | None = None):
+        self.directory = directory or default_directory()
+        if max_bytes is None:
+            max_bytes = int(os.environ.get("LOX_CACHE_SIZE", DEFAULT_MAX_BYTES))
+        self.max_bytes = max_bytes
+
+    def key(self, source: str, optimize: bool = False) -> str:
+        digest = hashlib.sha256()
+        digest.update(
+            f"{VERSION}:{FORMAT}:{platform.python_version()}:{optimize}:".encode()
+        )
+        digest.update(source.encode())
+        return digest.hexdigest()
+
+    def path(self, key: str) -> Path:
+        return self.directory / f"{key}.pickle"
+
+    def load(self, key: str) -> List[stmt.Stmt] | None:
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                statements = pickle.load(f)
+            intern_strings(statements)
+            os.utime(path)
+            return statements
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # unreadable or written by an incompatible version, which can fail
+            # in about any way while unpickling. the cache is best effort, drop
+            # the entry and parse again
+            path.unlink(missing_ok=True)
+            return None
+
+    def store(self, key: str, statements: List[stmt.Stmt]):
+        tmp = None
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(statements, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.path(key))
+        except (OSError, RecursionError, pickle.PicklingError):
+            # caching is best effort, running the program must not depend on it
+            if tmp is not None:
+                Path(tmp).unlink(missing_ok=True)
+            return
+        self.evict()
+
+    def entries(self) -> List[Tuple[Path, os.stat_result]]:
+        if not self.directory.exists():
+            return []
+        entries = []
+        for entry in self.directory.glob("*.pickle"):
+            try:
+                entries.append((entry, entry.stat()))
+            except OSError:
+                # another process evicted or cleared it since the listing
+                continue
+        return entries
+
+    def evict(self):
+        entries = sorted(self.entries(), key=lambda e: e[1].st_mtime)
+        total = sum(stat.st_size for _, stat in entries)
+        for entry, stat in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                entry.unlink(missing_ok=True)
+            except OSError:
+                # still counted, whatever is removable goes next
+                continue
+            total -= stat.st_size
+
+    def clear(self) -> int:
+        entries = self.entries()
+        for entry, _ in entries:
+            entry.unlink(missing_ok=True)
+        return len(entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Inspect or clear the Lox program cache."
+    )
+    parser.add_argument("command", choices=["info", "clear"])
+    parser.add_argument("--dir", type=Path, help="cache directory")
+    args = parser.parse_args()
+
+    cache = ProgramCache(args.dir)
+    if args.command == "clear":
+        print(f"removed {cache.clear()} entries from {cache.directory}")
+        return
+
+    entries = cache.entries()
+    total = sum(stat.st_size for _, stat in entries)
+    print(f"directory: {cache.directory}")
+    print(f"entries:   {len(entries)}")
+    print(f"size:      {total} / {cache.max_bytes} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+from array import array
+from enum import IntEnum
+from typing import List
+
+
+class OpCode(IntEnum):
+    CONSTANT = 0
+    NIL = 1
+    TRUE = 2
+    FALSE = 3
+    POP = 4
+    GET_LOCAL = 5
+    SET_LOCAL = 6
+    GET_GLOBAL = 7
+    DEFINE_GLOBAL = 8
+    SET_GLOBAL = 9
+    EQUAL = 10
+    NOT_EQUAL = 11
+    GREATER = 12
+    GREATER_EQUAL = 13
+    LESS = 14
+    LESS_EQUAL = 15
+    ADD = 16
+    SUBTRACT = 17
+    MULTIPLY = 18
+    DIVIDE = 19
+    NOT = 20
+    NEGATE = 21
+    PRINT = 22
+    JUMP = 23
+    JUMP_IF_FALSE = 24
+    LOOP = 25
+    RETURN = 26
+
+
+class Chunk:
+    code: array
+    lines: array
+    constants: List[object]
+
+    def __init__(self):
+        self.code = array("B")
+        self.lines = array("I")
+        self.constants = []
+
+    def write(self, byte: int, line: int):
+        self.code.append(byte)
+        self.lines.append(line)
+
+    def add_constant(self, value: object) -> int:
+        self.constants.append(value)
+        return len(self.constants) - 1
+
+    def disassemble(self, name: str) -> List[str]:
+        out = [f"== {name} =="]
+        offset = 0
+        while offset < len(self.code):
+            instruction = OpCode(self.code[offset])
+            prefix = f"{offset:04d} {self.lines[offset]:4d} {instruction.name:<16}"
+            if instruction in CONSTANT_OPERAND:
+                index = self.code[offset + 1]
+                out.append(f"{prefix} {index:4d} {self.constants[index]!r}")
+                offset += 2
+            elif instruction in BYTE_OPERAND:
+                out.append(f"{prefix} {self.code[offset + 1]:4d}")
+                offset += 2
+            elif instruction in JUMP_OPERAND:
+                jump = (self.code[offset + 1] << 8) | self.code[offset + 2]
+                sign = -1 if instruction == OpCode.LOOP else 1
+                out.append(f"{prefix} {offset} -> {offset + 3 + sign * jump}")
+                offset += 3
+            else:
+                out.append(prefix.rstrip())
+                offset += 1
+        return out
+
+
+CONSTANT_OPERAND = {
+    OpCode.CONSTANT,
+    OpCode.GET_GLOBAL,
+    OpCode.DEFINE_GLOBAL,
+    OpCode.SET_GLOBAL,
+}
+BYTE_OPERAND = {OpCode.GET_LOCAL, OpCode.SET_LOCAL}
+JUMP_OPERAND = {OpCode.JUMP, OpCode.JUMP_IF_FALSE, OpCode.LOOP}
@@ -0,0 +1,360 @@
+from typing import Any
+from typing import Callable
+from typing import List
+
+import expr
+import stmt
+from environment import Environment
+from environment import GlobalEnvironment
+from lox import Lox
+from output import Output
+from resolver import loop_scope
+from rope import STRING_TYPES
+from rope import concat
+from rope import strings_equal
+from runtimeerror import RuntimeError
+from token_type import TokenType
+from tokens import Token
+
+# every node is compiled to a closure taking the current environment
+Closure = Callable[[Environment | GlobalEnvironment], Any]
+
+
+def is_true(obj: object) -> bool:
+    return obj is not None and obj is not False
+
+
+def is_equal(a: object, b: object) -> bool:
+    if type(a) is type(b):
+        return a == b
+    return strings_equal(a, b)
+
+
+class ClosureCompiler(stmt.Visitor, expr.Visitor):
+    globals: GlobalEnvironment
+    interpreter: "ClosureInterpreter"
+
+    def __init__(self, interpreter: "ClosureInterpreter"):
+        self.globals = interpreter.globals
+        self.interpreter = interpreter
+
+    def compile(self, statements: List[stmt.Stmt]) -> List[Closure]:
+        return [self.compile_node(statement) for statement in statements]
+
+    def compile_node(self, node: stmt.Stmt | expr.Expr) -> Closure:
+        return node.accept(self)
+
+    def visit_expression_stmt(self, stmt: stmt.Expression) -> Closure:
+        return self.compile_node(stmt.expression)
+
+    def visit_print_stmt(self, stmt: stmt.Print) -> Closure:
+        value = self.compile_node(stmt.expression)
+        write = self.interpreter.output.print
+
+        def print_stmt(env):
+            write(value(env))
+
+        return print_stmt
+
+    def visit_var_stmt(self, stmt: stmt.Var) -> Closure:
+        if stmt.initializer is not None:
+            initializer = self.compile_node(stmt.initializer)
+        else:
+            initializer = lambda env: None
+
+        if stmt.slot is None:
+            name = stmt.name.lexeme
+            values = self.globals.values
+
+            def define_global(env):
+                values[name] = initializer(env)
+
+            return define_global
+
+        slot = stmt.slot
+
+        def define_local(env):
+            env.values[slot] = initializer(env)
+
+        return define_local
+
+    def visit_block_stmt(self, stmt: stmt.Block) -> Closure:
+        statements = self.compile(stmt.statements)
+        size = stmt.size
+
+        if size == 0:
+
+            def block(env):
+                for statement in statements:
+                    statement(env)
+
+            return block
+
+        def block(env):
+            inner = Environment(env, size)
+            for statement in statements:
+                statement(inner)
+
+        return block
+
+    def visit_if_stmt(self, stmt: stmt.If) -> Closure:
+        condition = self.compile_node(stmt.condition)
+        then_branch = self.compile_node(stmt.then_branch)
+        if stmt.else_branch is None:
+
+            def if_then(env):
+                value = condition(env)
+                if value is not None and value is not False:
+                    then_branch(env)
+
+            return if_then
+
+        else_branch = self.compile_node(stmt.else_branch)
+
+        def if_then_else(env):
+            value = condition(env)
+            if value is not None and value is not False:
+                then_branch(env)
+            else:
+                else_branch(env)
+
+        return if_then_else
+
+    def visit_while_stmt(self, stmt: stmt.While) -> Closure:
+        condition = self.compile_node(stmt.condition)
+        block, rest = loop_scope(stmt.body)
+        if block is None:
+            body = self.compile_node(stmt.body)
+
+            def while_stmt(env):
+                value = condition(env)
+                while value is not None and value is not False:
+                    body(env)
+                    value = condition(env)
+
+            return while_stmt
+
+        statements = self.compile(block.statements)
+        after = self.compile(rest)
+        size = block.size
+
+        def hoisted_while_stmt(env):
+            inner = Environment(env, size)
+            value = condition(env)
+            while value is not None and value is not False:
+                for statement in statements:
+                    statement(inner)
+                for statement in after:
+                    statement(env)
+                value = condition(env)
+
+        return hoisted_while_stmt
+
+    def visit_literal_expr(self, expr: expr.Literal) -> Closure:
+        value = expr.value
+        return lambda env: value
+
+    def visit_grouping_expr(self, expr: expr.Grouping) -> Closure:
+        return self.compile_node(expr.expression)
+
+    def visit_variable_expr(self, expr: expr.Variable) -> Closure:
+        slot = expr.slot
+        if expr.depth is None:
+            return lambda env: self.globals.get(expr.name)
+        elif expr.depth == 0:
+            return lambda env: env.values[slot]
+        elif expr.depth == 1:
+            return lambda env: env.enclosing.values[slot]
+        depth = expr.depth
+        return lambda env: env.get_at(depth, slot)
+
+    def visit_assign_expr(self, expr: expr.Assign) -> Closure:
+        value = self.compile_node(expr.value)
+        slot = expr.slot
+        depth = expr.depth
+
+        if depth is None:
+            name = expr.name
+
+            def assign_global(env):
+                result = value(env)
+                self.globals.assign(name, result)
+                return result
+
+            return assign_global
+
+        def assign_local(env):
+            result = value(env)
+            env.assign_at(depth, slot, result)
+            return result
+
+        return assign_local
+
+    def visit_logical_expr(self, expr: expr.Logical) -> Closure:
+        left = self.compile_node(expr.left)
+        right = self.compile_node(expr.right)
+
+        if expr.operator.type == TokenType.OR:
+
+            def logical_or(env):
+                value = left(env)
+                if value is not None and value is not False:
+                    return value
+                return right(env)
+
+            return logical_or
+
+        def logical_and(env):
+            value = left(env)
+            if value is None or value is False:
+                return value
+            return right(env)
+
+        return logical_and
+
+    def visit_unary_expr(self, expr: expr.Unary) -> Closure:
+        right = self.compile_node(expr.right)
+        operator = expr.operator
+
+        if operator.type == TokenType.MINUS:
+
+            def negate(env):
+                value = right(env)
+                if type(value) is not float:
+                    raise RuntimeError(operator, "Operand must be a number.")
+                return -value
+
+            return negate
+
+        return lambda env: not is_true(right(env))
+
+    def visit_binary_expr(self, expr: expr.Binary) -> Closure:
+        left = self.compile_node(expr.left)
+        right = self.compile_node(expr.right)
+        operator = expr.operator
+
+        if operator.type == TokenType.PLUS:
+
+            def add(env):
+                a = left(env)
+                b = right(env)
+                if a.__class__ is float and b.__class__ is float:
+                    return a + b
+                if a.__class__ in STRING_TYPES and b.__class__ in STRING_TYPES:
+                    return concat(a, b)
+                raise RuntimeError(
+                    operator, "Operands must be two numbers or two strings."
+                )
+
+            return add
+
+        if operator.type == TokenType.EQUAL_EQUAL:
+            return lambda env: is_equal(left(env), right(env))
+
+        if operator.type == TokenType.BANG_EQUAL:
+            return lambda env: not is_equal(left(env), right(env))
+
+        return number_operator(operator, left, right)
+
+
+def number_operator(operator: Token, left: Closure, right: Closure) -> Closure:
+    op_type = operator.type
+
+    if op_type == TokenType.MINUS:
+
+        def subtract(env):
+            a = left(env)
+            b = right(env)
+            if a.__class__ is not float or b.__class__ is not float:
+                raise RuntimeError(operator, "Operands must be numbers.")
+            return a - b
+
+        return subtract
+
+    if op_type == TokenType.SLASH:
+
+        def divide(env):
+            a = left(env)
+            b = right(env)
+            if a.__class__ is not float or b.__class__ is not float:
+                raise RuntimeError(operator, "Operands must be numbers.")
+            return a / b
+
+        return divide
+
+    if op_type == TokenType.STAR:
+
+        def multiply(env):
+            a = left(env)
+            b = right(env)
+            if a.__class__ is not float or b.__class__ is not float:
+                raise RuntimeError(operator, "Operands must be numbers.")
+            return a * b
+
+        return multiply
+
+    if op_type == TokenType.GREATER:
+
+        def greater(env):
+            a = left(env)
+            b = right(env)
+            if a.__class__ is not float or b.__class__ is not float:
+                raise RuntimeError(operator, "Operands must be numbers.")
+            return a > b
+
+        return greater
+
+    if op_type == TokenType.GREATER_EQUAL:
+
+        def greater_equal(env):
+            a = left(env)
+            b = right(env)
+            if a.__class__ is not float or b.__class__ is not float:
+                raise RuntimeError(operator, "Operands must be numbers.")
+            return a >= b
+
+        return greater_equal
+
+    if op_type == TokenType.LESS:
+
+        def less(env):
+            a = left(env)
+            b = right(env)
+            if a.__class__ is not float or b.__class__ is not float:
+                raise RuntimeError(operator, "Operands must be numbers.")
+            return a < b
+
+        return less
+
+    def less_equal(env):
+        a = left(env)
+        b = right(env)
+        if a.__class__ is not float or b.__class__ is not float:
+            raise RuntimeError(operator, "Operands must be numbers.")
+        return a <= b
+
+    return less_equal
+
+
+class ClosureInterpreter:
+    globals: GlobalEnvironment
+    output: Output
+
+    def __init__(self, output: Output | None = None):
+        self.globals = GlobalEnvironment()
+        self.output = output or Output()
+
+    def compile(self, statements: List[stmt.Stmt]) -> List[Closure]:
+        return ClosureCompiler(self).compile(statements)
+
+    def run(self, program: List[Closure]):
+        for statement in program:
+            statement(self.globals)
+
+    def interpret(self, statements: List[stmt.Stmt]):
+        program = self.compile(statements)
+        try:
+            self.run(program)
+        except (RuntimeError) as e:
+            self.output.flush()
+            Lox.runtime_error(e)
@@ -0,0 +1,254 @@
+from typing import List
+from typing import Tuple
+
+import expr
+import stmt
+from chunk import Chunk
+from chunk import OpCode
+from lox import Lox
+from token_type import TokenType
+from tokens import Token
+
+UINT8_COUNT = 256
+UINT16_MAX = 65535
+
+BINARY_OPCODES = {
+    TokenType.PLUS: OpCode.ADD,
+    TokenType.MINUS: OpCode.SUBTRACT,
+    TokenType.STAR: OpCode.MULTIPLY,
+    TokenType.SLASH: OpCode.DIVIDE,
+    TokenType.EQUAL_EQUAL: OpCode.EQUAL,
+    TokenType.BANG_EQUAL: OpCode.NOT_EQUAL,
+    TokenType.GREATER: OpCode.GREATER,
+    TokenType.GREATER_EQUAL: OpCode.GREATER_EQUAL,
+    TokenType.LESS: OpCode.LESS,
+    TokenType.LESS_EQUAL: OpCode.LESS_EQUAL,
+}
+
+
+class CompileError(Exception):
+    pass
+
+
+class Compiler(stmt.Visitor, expr.Visitor):
+    chunk: Chunk
+    # (name, depth) of every local living on the vm stack, depth -1 until
+    # the initializer has run
+    locals: List[Tuple[str, int]]
+    scope_depth: int
+    line: int
+
+    def __init__(self):
+        self.chunk = Chunk()
+        self.locals = []
+        self.scope_depth = 0
+        self.line = 1
+
+    def compile(self, statements: List[stmt.Stmt]) -> Chunk | None:
+        had_error = False
+        for statement in statements:
+            try:
+                self.compile_node(statement)
+            except CompileError:
+                had_error = True
+        self.emit_byte(OpCode.RETURN)
+        return None if had_error else self.chunk
+
+    def compile_node(self, node: stmt.Stmt | expr.Expr):
+        node.accept(self)
+
+    def error(self, message: str, token: Token | None = None) -> CompileError:
+        if token is None:
+            Lox.error_line(self.line, message)
+        else:
+            Lox.error(token, message)
+        return CompileError()
+
+    def mark(self, token: Token | None):
+        # every node that emits code marks where it was written, so the line
+        # table and errors follow the source. nodes the front end made up
+        # have no token and keep the line before them
+        if token is not None:
+            self.line = token.line
+
+    def emit_byte(self, byte: int):
+        self.chunk.write(byte, self.line)
+
+    def emit_bytes(self, first: int, second: int):
+        self.emit_byte(first)
+        self.emit_byte(second)
+
+    def make_constant(self, value: object, token: Token | None = None) -> int:
+        if len(self.chunk.constants) == UINT8_COUNT:
+            raise self.error("Too many constants in one chunk.", token)
+        return self.chunk.add_constant(value)
+
+    def emit_constant(self, value: object, token: Token | None = None):
+        self.emit_bytes(OpCode.CONSTANT, self.make_constant(value, token))
+
+    def emit_jump(self, instruction: OpCode) -> int:
+        self.emit_byte(instruction)
+        self.emit_byte(0xFF)
+        self.emit_byte(0xFF)
+        return len(self.chunk.code) - 2
+
+    def patch_jump(self, offset: int):
+        jump = len(self.chunk.code) - offset - 2
+        if jump > UINT16_MAX:
+            raise self.error("Too much code to jump over.")
+        self.chunk.code[offset] = (jump >> 8) & 0xFF
+        self.chunk.code[offset + 1] = jump & 0xFF
+
+    def emit_loop(self, loop_start: int, end: Token | None = None):
+        self.emit_byte(OpCode.LOOP)
+        offset = len(self.chunk.code) - loop_start + 2
+        if offset > UINT16_MAX:
+            raise self.error("Loop body too large.", end)
+        self.emit_byte((offset >> 8) & 0xFF)
+        self.emit_byte(offset & 0xFF)
+
+    def begin_scope(self):
+        self.scope_depth += 1
+
+    def end_scope(self):
+        self.scope_depth -= 1
+        while len(self.locals) > 0 and self.locals[-1][1] > self.scope_depth:
+            self.emit_byte(OpCode.POP)
+            self.locals.pop()
+
+    def add_local(self, name: Token):
+        if len(self.locals) == UINT8_COUNT:
+            raise self.error("Too many local variables in function.", name)
+        self.locals.append((name.lexeme, -1))
+
+    def resolve_local(self, name: Token) -> int | None:
+        for slot in range(len(self.locals) - 1, -1, -1):
+            if self.locals[slot][0] == name.lexeme:
+                return slot
+        return None
+
+    def visit_block_stmt(self, stmt: stmt.Block):
+        self.begin_scope()
+        for statement in stmt.statements:
+            self.compile_node(statement)
+        self.mark(stmt.end)
+        self.end_scope()
+
+    def visit_expression_stmt(self, stmt: stmt.Expression):
+        self.compile_node(stmt.expression)
+        self.emit_byte(OpCode.POP)
+
+    def visit_print_stmt(self, stmt: stmt.Print):
+        self.compile_node(stmt.expression)
+        self.mark(stmt.keyword)
+        self.emit_byte(OpCode.PRINT)
+
+    def visit_var_stmt(self, stmt: stmt.Var):
+        self.mark(stmt.name)
+        if self.scope_depth > 0:
+            self.add_local(stmt.name)
+        else:
+            global_index = self.make_constant(stmt.name.lexeme, stmt.name)
+
+        if stmt.initializer is not None:
+            self.compile_node(stmt.initializer)
+        else:
+            self.emit_byte(OpCode.NIL)
+
+        if self.scope_depth > 0:
+            # the initializer value left on the stack becomes the local's slot
+            self.locals[-1] = (stmt.name.lexeme, self.scope_depth)
+        else:
+            self.mark(stmt.name)
+            self.emit_bytes(OpCode.DEFINE_GLOBAL, global_index)
+
+    def visit_if_stmt(self, stmt: stmt.If):
+        self.compile_node(stmt.condition)
+        then_jump = self.emit_jump(OpCode.JUMP_IF_FALSE)
+        self.emit_byte(OpCode.POP)
+        self.compile_node(stmt.then_branch)
+
+        else_jump = self.emit_jump(OpCode.JUMP)
+        self.patch_jump(then_jump)
+        self.emit_byte(OpCode.POP)
+        if stmt.else_branch is not None:
+            self.compile_node(stmt.else_branch)
+        self.patch_jump(else_jump)
+
+    def visit_while_stmt(self, stmt: stmt.While):
+        loop_start = len(self.chunk.code)
+        self.compile_node(stmt.condition)
+        exit_jump = self.emit_jump(OpCode.JUMP_IF_FALSE)
+        self.emit_byte(OpCode.POP)
+        self.compile_node(stmt.body)
+        self.mark(stmt.end)
+        self.emit_loop(loop_start, stmt.end)
+
+        self.patch_jump(exit_jump)
+        self.emit_byte(OpCode.POP)
+
+    def visit_binary_expr(self, expr: expr.Binary):
+        self.compile_node(expr.left)
+        self.compile_node(expr.right)
+        self.mark(expr.operator)
+        self.emit_byte(BINARY_OPCODES[expr.operator.type])
+
+    def visit_grouping_expr(self, expr: expr.Grouping):
+        self.compile_node(expr.expression)
+
+    def visit_literal_expr(self, expr: expr.Literal):
+        self.mark(expr.token)
+        if expr.value is None:
+            self.emit_byte(OpCode.NIL)
+        elif expr.value is True:
+            self.emit_byte(OpCode.TRUE)
+        elif expr.value is False:
+            self.emit_byte(OpCode.FALSE)
+        else:
+            self.emit_constant(expr.value, expr.token)
+
+    def visit_logical_expr(self, expr: expr.Logical):
+        self.compile_node(expr.left)
+        self.mark(expr.operator)
+        if expr.operator.type == TokenType.AND:
+            end_jump = self.emit_jump(OpCode.JUMP_IF_FALSE)
+            self.emit_byte(OpCode.POP)
+            self.compile_node(expr.right)
+            self.patch_jump(end_jump)
+            return
+
+        else_jump = self.emit_jump(OpCode.JUMP_IF_FALSE)
+        end_jump = self.emit_jump(OpCode.JUMP)
+        self.patch_jump(else_jump)
+        self.emit_byte(OpCode.POP)
+        self.compile_node(expr.right)
+        self.patch_jump(end_jump)
+
+    def visit_unary_expr(self, expr: expr.Unary):
+        self.compile_node(expr.right)
+        self.mark(expr.operator)
+        if expr.operator.type == TokenType.MINUS:
+            self.emit_byte(OpCode.NEGATE)
+        else:
+            self.emit_byte(OpCode.NOT)
+
+    def visit_variable_expr(self, expr: expr.Variable):
+        self.mark(expr.name)
+        slot = self.resolve_local(expr.name)
+        if slot is not None:
+            self.emit_bytes(OpCode.GET_LOCAL, slot)
+        else:
+            self.emit_bytes(
+                OpCode.GET_GLOBAL, self.make_constant(expr.name.lexeme, expr.name)
+            )
+
+    def visit_assign_expr(self, expr: expr.Assign):
+        self.compile_node(expr.value)
+        self.mark(expr.name)
+        slot = self.resolve_local(expr.name)
+        if slot is not None:
+            self.emit_bytes(OpCode.SET_LOCAL, slot)
+        else:
+            self.emit_bytes(
+                OpCode.SET_GLOBAL, self.make_constant(expr.name.lexeme, expr.name)
+            )
@@ -1,30 +1,53 @@
-from typing import Dict, Any
+from typing import Dict, Any, List
 from tokens import Token
 from runtimeerror import RuntimeError
 
 class Environment:
-    values: Dict
-    enclosing: "Environment"
+    __slots__ = ("values", "enclosing")
 
-    def __init__(self, enclosing = None):
+    values: List[Any]
+    enclosing: "Environment | GlobalEnvironment"
+
+    def __init__(self, enclosing, size: int):
         self.enclosing = enclosing
+        self.values = [None] * size
+
+    def define(self, slot: int, value: Any):
+        self.values[slot] = value
+
+    def ancestor(self, distance: int) -> "Environment":
+        environment = self
+        while distance:
+            environment = environment.enclosing
+            distance -= 1
+        return environment
+
+    def get_at(self, distance: int, slot: int) -> Any:
+        return self.ancestor(distance).values[slot]
+
+    def assign_at(self, distance: int, slot: int, value: Any):
+        self.ancestor(distance).values[slot] = value
+
+
+class GlobalEnvironment:
+    # globals are late bound and may be redefined, so they keep the name lookup
+    __slots__ = ("values",)
+
+    values: Dict[str, Any]
+
+    def __init__(self):
         self.values = {}
 
     def define(self, name: str, value: Any):
         self.values[name] = value
-    
+
     def get(self, name: Token) -> Any:
-        if name.lexeme in self.values.keys():
+        if name.lexeme in self.values:
             return self.values[name.lexeme]
-        if self.enclosing is not None:
-            return self.enclosing.get(name)
         raise RuntimeError(name, f'Undefined variable "{name.lexeme}".')
 
     def assign(self, name: Token, value: Any):
-        if name.lexeme in self.values.keys():
+        if name.lexeme in self.values:
             self.values[name.lexeme] = value
             return
-        if self.enclosing is not None:
-            self.enclosing.assign(name, value)
-            return
         raise RuntimeError(name, f'Undefined variable "{name.lexeme}".')
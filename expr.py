@@ -40,14 +40,64 @@ class Visitor(ABC, Generic[T]):
     def visit_assign_expr(self, expr: Assign) -> T:
         pass
 
+    # the Interpreter rewrites Binary and Unary nodes it has run into the
+    # specialized classes of quickening.py, any other visitor walking such a
+    # tree again sees the generic node kind
+    def visit_generic_binary_expr(self, expr: Binary) -> T:
+        return self.visit_binary_expr(expr)
+
+    def visit_number_add_expr(self, expr: Binary) -> T:
+        return self.visit_binary_expr(expr)
+
+    def visit_string_concat_expr(self, expr: Binary) -> T:
+        return self.visit_binary_expr(expr)
+
+    def visit_number_subtract_expr(self, expr: Binary) -> T:
+        return self.visit_binary_expr(expr)
+
+    def visit_number_multiply_expr(self, expr: Binary) -> T:
+        return self.visit_binary_expr(expr)
+
+    def visit_number_divide_expr(self, expr: Binary) -> T:
+        return self.visit_binary_expr(expr)
+
+    def visit_number_greater_expr(self, expr: Binary) -> T:
+        return self.visit_binary_expr(expr)
+
+    def visit_number_greater_equal_expr(self, expr: Binary) -> T:
+        return self.visit_binary_expr(expr)
+
+    def visit_number_less_expr(self, expr: Binary) -> T:
+        return self.visit_binary_expr(expr)
+
+    def visit_number_less_equal_expr(self, expr: Binary) -> T:
+        return self.visit_binary_expr(expr)
+
+    def visit_equal_expr(self, expr: Binary) -> T:
+        return self.visit_binary_expr(expr)
+
+    def visit_not_equal_expr(self, expr: Binary) -> T:
+        return self.visit_binary_expr(expr)
+
+    def visit_generic_unary_expr(self, expr: Unary) -> T:
+        return self.visit_unary_expr(expr)
+
+    def visit_number_negate_expr(self, expr: Unary) -> T:
+        return self.visit_unary_expr(expr)
+
+    def visit_not_expr(self, expr: Unary) -> T:
+        return self.visit_unary_expr(expr)
+
 
 class Expr(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def accept(self, visitor: Visitor):
         pass
 
 
-@dataclass
+@dataclass(slots=True)
 class Binary(Expr):
     left: Expr
     operator: Token
@@ -57,7 +107,7 @@ class Binary(Expr):
         return visitor.visit_binary_expr(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class Grouping(Expr):
     expression: Expr
 
@@ -65,15 +115,17 @@ class Grouping(Expr):
         return visitor.visit_grouping_expr(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class Literal(Expr):
     value: object
+    # where it was written, None for a value the front end made up
+    token: Token | None = None
 
     def accept(self, visitor: Visitor):
         return visitor.visit_literal_expr(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class Logical(Expr):
     left: Expr
     operator: Token
@@ -83,7 +135,7 @@ class Logical(Expr):
         return visitor.visit_logical_expr(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class Unary(Expr):
     operator: Token
     right: Expr
@@ -92,18 +144,22 @@ class Unary(Expr):
         return visitor.visit_unary_expr(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class Variable(Expr):
     name: Token
+    depth: int | None = None
+    slot: int | None = None
 
     def accept(self, visitor: Visitor):
         return visitor.visit_variable_expr(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class Assign(Expr):
     name: Token
     value: Expr
+    depth: int | None = None
+    slot: int | None = None
 
     def accept(self, visitor: Visitor):
         return visitor.visit_assign_expr(self)
@@ -0,0 +1,169 @@
+from collections import Counter
+from dataclasses import dataclass, fields
+from typing import Dict, List, Tuple
+
+import expr
+import stmt
+from lox import Lox
+from tokens import Token
+
+
+@dataclass(slots=True)
+class Span:
+    start: int
+    end: int
+    line: int
+    # false when the source ended inside the declaration
+    complete: bool
+
+
+def skip_blank(source: str, i: int) -> int:
+    n = len(source)
+    while i < n:
+        if source[i] in " \r\t\n":
+            i += 1
+        elif source.startswith("//", i):
+            end = source.find("\n", i)
+            i = n if end == -1 else end
+        else:
+            break
+    return i
+
+
+def continues_with_else(source: str, i: int) -> bool:
+    i = skip_blank(source, i)
+    if not source.startswith("else", i):
+        return False
+    after = source[i + 4 : i + 5]
+    return not (after.isalnum() or after == "_")
+
+
+def split(source: str) -> List[Span]:
+    # cuts the source into top level declarations without scanning it: a
+    # declaration ends at a ; or } outside any parentheses or braces, unless
+    # an else follows. strings and comments are skipped so their content
+    # cannot end one
+    spans = []
+    n = len(source)
+    depth = 0
+    line = 1
+    start = None
+    start_line = 1
+    i = 0
+    while i < n:
+        c = source[i]
+        if c == "\n":
+            line += 1
+            i += 1
+            continue
+        if c in " \r\t":
+            i += 1
+            continue
+        if source.startswith("//", i):
+            end = source.find("\n", i)
+            i = n if end == -1 else end
+            continue
+
+        if start is None:
+            start = i
+            start_line = line
+        if c == '"':
+            end = source.find('"', i + 1)
+            end = n - 1 if end == -1 else end
+            line += source.count("\n", i, end)
+            i = end + 1
+            continue
+
+        i += 1
+        if c in "({":
+            depth += 1
+        elif c in ")}":
+            depth = max(depth - 1, 0)
+        if depth == 0 and c in ";}" and not continues_with_else(source, i):
+            spans.append(Span(start, i, start_line, True))
+            start = None
+
+    if start is not None:
+        spans.append(Span(start, n, start_line, False))
+    return spans
+
+
+def is_complete(source: str) -> bool:
+    spans = split(source)
+    return not spans or spans[-1].complete
+
+
+def joins_previous(previous: str, source: str) -> bool:
+    # whether split would make source part of the last declaration of
+    # previous, an else after an if
+    return bool(previous) and continues_with_else(previous + source, len(previous))
+
+
+def rebase(node, delta: int):
+    # copies a parsed tree with every token moved by delta lines, the cached
+    # tree may still be in use where it was
+    if isinstance(node, Token):
+        return Token(node.type, node.lexeme, node.literal, node.line + delta)
+    if isinstance(node, list):
+        return [rebase(child, delta) for child in node]
+    if isinstance(node, (expr.Expr, stmt.Stmt)):
+        clone = object.__new__(type(node))
+        for field in fields(node):
+            setattr(clone, field.name, rebase(getattr(node, field.name), delta))
+        return clone
+    return node
+
+
+class IncrementalParser:
+    # keeps the statements parsed from each top level declaration keyed by
+    # its text, so parsing an edited source only scans and parses the
+    # declarations that changed. declarations that moved are reused with
+    # their line numbers shifted
+    spans: Dict[Tuple[str, int], Tuple[int, List[stmt.Stmt]]]
+    parsed: int
+    reused: int
+
+    def __init__(self):
+        self.spans = {}
+        self.parsed = 0
+        self.reused = 0
+
+    def parse(self, source: str) -> List[stmt.Stmt]:
+        statements = []
+        spans = {}
+        occurrences = Counter()
+        self.parsed = 0
+        self.reused = 0
+        for span in split(source):
+            text = source[span.start : span.end]
+            # the same text may appear more than once, each copy needs its own nodes
+            key = (text, occurrences[text])
+            occurrences[text] += 1
+
+            cached = self.spans.get(key)
+            if cached is None:
+                parsed = self.parse_span(text, span.line)
+                if parsed is None:
+                    continue
+                self.parsed += 1
+            else:
+                line, parsed = cached
+                if line != span.line:
+                    parsed = rebase(parsed, span.line - line)
+                self.reused += 1
+            spans[key] = (span.line, parsed)
+            statements.extend(parsed)
+
+        # forget declarations that are gone from the source
+        self.spans = spans
+        return statements
+
+    def parse_span(self, text: str, line: int) -> List[stmt.Stmt] | None:
+        had_error = Lox.has_error
+        Lox.has_error = False
+        tokens = Lox.scanner(text, line).scan_tokens()
+        statements = Lox.parser(tokens).parse()
+        failed = Lox.has_error
+        Lox.has_error = had_error or failed
+        # spans with errors are parsed again next time so they are reported again
+        return None if failed else statements
@@ -0,0 +1,66 @@
+import json
+from collections import Counter
+from typing import Any, Dict, List, TextIO
+
+import expr
+import stmt
+from environment import Environment
+from interpreter import Interpreter
+from output import Output
+from quickening import base_class
+from runtimeerror import RuntimeError
+
+
+class InstrumentedInterpreter(Interpreter):
+    # counting lives in overrides of the Interpreter entry points, so the
+    # plain Interpreter never checks whether instrumentation is enabled
+    statements: Counter
+    expressions: Counter
+    lookup_depths: Counter
+    environments: int
+    runtime_errors: List[Dict[str, Any]]
+
+    def __init__(self, output: Output | None = None):
+        super().__init__(output)
+        self.statements = Counter()
+        self.expressions = Counter()
+        self.lookup_depths = Counter()
+        self.environments = 0
+        self.runtime_errors = []
+
+    def execute(self, stmt: stmt.Stmt):
+        self.statements[base_class(type(stmt)).__name__] += 1
+        stmt.accept(self)
+
+    def evaluate(self, expr: expr.Expr) -> object:
+        self.expressions[base_class(type(expr)).__name__] += 1
+        return expr.accept(self)
+
+    def scope(self, size: int) -> Environment:
+        self.environments += 1
+        return super().scope(size)
+
+    def visit_variable_expr(self, expr: expr.Variable) -> object:
+        self.lookup_depths["global" if expr.depth is None else expr.depth] += 1
+        return super().visit_variable_expr(expr)
+
+    def visit_assign_expr(self, expr: expr.Assign) -> object:
+        self.lookup_depths["global" if expr.depth is None else expr.depth] += 1
+        return super().visit_assign_expr(expr)
+
+    def report_runtime_error(self, error: RuntimeError):
+        self.runtime_errors.append({"message": error.message, "line": error.line})
+        super().report_runtime_error(error)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "statements": dict(self.statements),
+            "expressions": dict(self.expressions),
+            "environments": self.environments,
+            "lookup_depths": {str(k): v for k, v in self.lookup_depths.items()},
+            "runtime_errors": self.runtime_errors,
+        }
+
+    def dump(self, out: TextIO):
+        json.dump(self.stats(), out, indent=2)
+        out.write("\n")
@@ -3,31 +3,55 @@ from typing import cast
 from typing import List
 
 import expr
+import quickening
 import stmt
 from environment import Environment
+from environment import GlobalEnvironment
 from lox import Lox
+from output import Output
+from resolver import loop_scope
+from rope import STRING_TYPES
+from rope import concat
+from rope import strings_equal
 from runtimeerror import RuntimeError
 from token_type import TokenType
 from tokens import Token
 
 
 class Interpreter(stmt.Visitor, expr.Visitor):
-    environment: Environment
+    globals: GlobalEnvironment
+    environment: Environment | GlobalEnvironment
+    output: Output
 
-    def __init__(self):
-        self.environment = Environment()
+    def __init__(self, output: Output | None = None):
+        self.globals = GlobalEnvironment()
+        self.environment = self.globals
+        self.output = output or Output()
+
+    def compile(self, statements: List[stmt.Stmt]) -> List[stmt.Stmt]:
+        # the tree walker runs the resolved statements as they are
+        return statements
+
+    def run(self, statements: List[stmt.Stmt]):
+        for statement in statements:
+            self.execute(statement)
 
     def interpret(self, statements: List[stmt.Stmt]):
         try:
-            for statement in statements:
-                self.execute(statement)
+            self.run(self.compile(statements))
         except (RuntimeError) as e:
-            Lox.runtime_error(e)
+            self.output.flush()
+            self.report_runtime_error(e)
+
+    def report_runtime_error(self, error: RuntimeError):
+        Lox.runtime_error(error)
 
     def execute(self, stmt: stmt.Stmt):
         stmt.accept(self)
 
-    def execute_block(self, statements: List[stmt.Stmt], environment: Environment):
+    def execute_block(
+        self, statements: List[stmt.Stmt], environment: Environment | GlobalEnvironment
+    ):
         previous = self.environment
         try:
             self.environment = environment
@@ -43,8 +67,16 @@ class Interpreter(stmt.Visitor, expr.Visitor):
         self.evaluate(stmt.expression)
         return None
 
+    def scope(self, size: int) -> Environment:
+        return Environment(self.environment, size)
+
     def visit_block_stmt(self, stmt: stmt.Block):
-        self.execute_block(stmt.statements, Environment(self.environment))
+        if stmt.size == 0:
+            # declares nothing, run it where we are
+            for statement in stmt.statements:
+                self.execute(statement)
+            return
+        self.execute_block(stmt.statements, self.scope(stmt.size))
 
     def visit_if_stmt(self, stmt: stmt.If) -> None:
         if self.is_true(self.evaluate(stmt.condition)):
@@ -54,29 +86,121 @@ class Interpreter(stmt.Visitor, expr.Visitor):
         return None
 
     def visit_while_stmt(self, stmt: stmt.While) -> None:
-        while self.is_true(self.evaluate(stmt.condition)):
-            self.execute(stmt.body)
+        block, rest = loop_scope(stmt.body)
+        if block is None:
+            while self.is_true(self.evaluate(stmt.condition)):
+                self.execute(stmt.body)
+            return None
 
+        environment = self.scope(block.size)
+        while self.is_true(self.evaluate(stmt.condition)):
+            self.execute_block(block.statements, environment)
+            for statement in rest:
+                self.execute(statement)
         return None
 
     def visit_print_stmt(self, stmt: stmt.Print) -> None:
         value = self.evaluate(stmt.expression)
-        print(value)
+        self.output.print(value)
         return None
 
     def visit_var_stmt(self, stmt: stmt.Var) -> None:
         value = None
         if stmt.initializer:
             value = self.evaluate(stmt.initializer)
-        self.environment.define(stmt.name.lexeme, value)
+        if stmt.slot is None:
+            self.globals.define(stmt.name.lexeme, value)
+        else:
+            self.environment.define(stmt.slot, value)
 
     def visit_binary_expr(self, expr: expr.Binary) -> object:
         left: Any = self.evaluate(expr.left)
         right: Any = self.evaluate(expr.right)
+        value = self.binary_operation(expr, left, right)
+        # rewrite the node into a fast path for the operand types just seen,
+        # only after the operation succeeded so errors stay on the generic path
+        expr.__class__ = quickening.specialize_binary(expr.operator.type, left, right)
+        return value
 
-        if expr.operator.type not in [TokenType.PLUS]:
-            self.check_number_operands(expr.operator, left, right)
+    def visit_generic_binary_expr(self, expr: expr.Binary) -> object:
+        left: Any = self.evaluate(expr.left)
+        right: Any = self.evaluate(expr.right)
+        return self.binary_operation(expr, left, right)
 
+    def despecialize_binary(self, expr: expr.Binary, left: Any, right: Any) -> object:
+        expr.__class__ = quickening.GenericBinary
+        return self.binary_operation(expr, left, right)
+
+    def visit_number_add_expr(self, expr: expr.Binary) -> object:
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        if type(left) is float and type(right) is float:
+            return left + right
+        return self.despecialize_binary(expr, left, right)
+
+    def visit_string_concat_expr(self, expr: expr.Binary) -> object:
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        if type(left) in STRING_TYPES and type(right) in STRING_TYPES:
+            return concat(left, right)
+        return self.despecialize_binary(expr, left, right)
+
+    def visit_number_subtract_expr(self, expr: expr.Binary) -> object:
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        if type(left) is float and type(right) is float:
+            return left - right
+        return self.despecialize_binary(expr, left, right)
+
+    def visit_number_multiply_expr(self, expr: expr.Binary) -> object:
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        if type(left) is float and type(right) is float:
+            return left * right
+        return self.despecialize_binary(expr, left, right)
+
+    def visit_number_divide_expr(self, expr: expr.Binary) -> object:
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        if type(left) is float and type(right) is float:
+            return left / right
+        return self.despecialize_binary(expr, left, right)
+
+    def visit_number_greater_expr(self, expr: expr.Binary) -> object:
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        if type(left) is float and type(right) is float:
+            return left > right
+        return self.despecialize_binary(expr, left, right)
+
+    def visit_number_greater_equal_expr(self, expr: expr.Binary) -> object:
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        if type(left) is float and type(right) is float:
+            return left >= right
+        return self.despecialize_binary(expr, left, right)
+
+    def visit_number_less_expr(self, expr: expr.Binary) -> object:
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        if type(left) is float and type(right) is float:
+            return left < right
+        return self.despecialize_binary(expr, left, right)
+
+    def visit_number_less_equal_expr(self, expr: expr.Binary) -> object:
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        if type(left) is float and type(right) is float:
+            return left <= right
+        return self.despecialize_binary(expr, left, right)
+
+    def visit_equal_expr(self, expr: expr.Binary) -> object:
+        return self.is_equal(self.evaluate(expr.left), self.evaluate(expr.right))
+
+    def visit_not_equal_expr(self, expr: expr.Binary) -> object:
+        return not self.is_equal(self.evaluate(expr.left), self.evaluate(expr.right))
+
+    def binary_operation(self, expr: expr.Binary, left: Any, right: Any) -> object:
         if expr.operator.type == TokenType.MINUS:
             self.check_number_operands(expr.operator, left, right)
             return float(left) - float(right)
@@ -85,46 +209,48 @@ class Interpreter(stmt.Visitor, expr.Visitor):
             self.check_number_operands(expr.operator, left, right)
             return float(left) / float(right)
 
-        elif expr.operator.type == TokenType.DOT:
+        elif expr.operator.type == TokenType.STAR:
             self.check_number_operands(expr.operator, left, right)
             return float(left) * float(right)
 
         elif expr.operator.type == TokenType.PLUS:
-            if (type(left) is float and type(right) is float) or (
-                type(left) is float and type(right) is float
-            ):
+            if type(left) is float and type(right) is float:
                 return float(left) + float(right)
 
-            elif type(left) is str and type(right) is str:
-                return left + right
+            elif type(left) in STRING_TYPES and type(right) in STRING_TYPES:
+                return concat(left, right)
             raise RuntimeError(
                 expr.operator, "Operands must be two numbers or two strings."
             )
 
         elif expr.operator.type == TokenType.GREATER:
+            self.check_number_operands(expr.operator, left, right)
             return float(left) > float(right)
 
         elif expr.operator.type == TokenType.GREATER_EQUAL:
+            self.check_number_operands(expr.operator, left, right)
             return float(left) >= float(right)
 
         elif expr.operator.type == TokenType.LESS:
+            self.check_number_operands(expr.operator, left, right)
             return float(left) < float(right)
 
         elif expr.operator.type == TokenType.LESS_EQUAL:
+            self.check_number_operands(expr.operator, left, right)
             return float(left) <= float(right)
 
         elif expr.operator.type == TokenType.EQUAL_EQUAL:
-            return left == right
+            return self.is_equal(left, right)
 
         elif expr.operator.type == TokenType.BANG_EQUAL:
-            return left != right
+            return not self.is_equal(left, right)
 
     def visit_logical_expr(self, expr: expr.Logical) -> object:
         left = self.evaluate(expr.left)
-        if expr.operator == TokenType.OR:
+        if expr.operator.type == TokenType.OR:
             if self.is_true(left):
                 return left
-        elif expr.operator == TokenType.AND:
+        elif expr.operator.type == TokenType.AND:
             if not self.is_true(left):
                 return left
         return self.evaluate(expr.right)
@@ -136,35 +262,64 @@ class Interpreter(stmt.Visitor, expr.Visitor):
         return expr.value
 
     def visit_variable_expr(self, expr: expr.Variable) -> object:
-        return self.environment.get(expr.name)
+        if expr.depth is None:
+            return self.globals.get(expr.name)
+        return self.environment.get_at(expr.depth, expr.slot)
 
     def visit_unary_expr(self, expr: expr.Unary) -> object:
         right = self.evaluate(expr.right)
-        self.check_number_operand(expr.operator, right)
+        value = self.unary_operation(expr, right)
+        expr.__class__ = quickening.specialize_unary(expr.operator.type, right)
+        return value
+
+    def visit_generic_unary_expr(self, expr: expr.Unary) -> object:
+        return self.unary_operation(expr, self.evaluate(expr.right))
+
+    def visit_number_negate_expr(self, expr: expr.Unary) -> object:
+        right = self.evaluate(expr.right)
+        if type(right) is float:
+            return -right
+        expr.__class__ = quickening.GenericUnary
+        return self.unary_operation(expr, right)
+
+    def visit_not_expr(self, expr: expr.Unary) -> object:
+        return not self.is_true(self.evaluate(expr.right))
+
+    def unary_operation(self, expr: expr.Unary, right: object) -> object:
         if expr.operator.type == TokenType.MINUS:
+            self.check_number_operand(expr.operator, right)
             return -float(cast(float, right))
 
         elif expr.operator.type == TokenType.BANG:
-            return not right
+            return not self.is_true(right)
 
     def visit_assign_expr(self, expr: expr.Assign) -> object:
         value = self.evaluate(expr.value)
-        self.environment.assign(expr.name, value)
+        if expr.depth is None:
+            self.globals.assign(expr.name, value)
+        else:
+            self.environment.assign_at(expr.depth, expr.slot, value)
         return value
 
     def is_true(self, obj: object) -> bool:
         if obj is None:
             return False
-        return bool(obj)
+        if type(obj) is bool:
+            return obj
+        return True
+
+    def is_equal(self, a: object, b: object) -> bool:
+        # python considers 1.0 == True, lox does not
+        if type(a) is type(b):
+            return a == b
+        return strings_equal(a, b)
 
     def check_number_operand(self, operator: Token, operand: object):
-        if type(operand) is not float or type(operand) is not int:
+        if type(operand) is float:
             return
-        raise RuntimeError(operator, "operand must be a number")
+        raise RuntimeError(operator, "Operand must be a number.")
 
     def check_number_operands(self, operator: Token, left: object, right: object):
-        if type(left) is not float or type(left) is not int:
-            return
-        if type(right) is not float or type(right) is not int:
+        if type(left) is float and type(right) is float:
             return
-        raise RuntimeError(operator, "operands must be a number")
+        raise RuntimeError(operator, "Operands must be numbers.")
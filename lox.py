@@ -1,66 +1,423 @@
+import argparse
+import os
 import sys
+import time
+from functools import partial
+from typing import Any, Callable, List
 
 from ast_printer import AstPrinter
 from runtimeerror import RuntimeError
 from token_type import TokenType
 from tokens import Token
+from tokens import TokenBuffer
+from stmt import Stmt
+
+VERSION = "0.3.0"
+FRONT_END_FRAMES = 16
+# what --engine stack may raise the recursion limit to, whatever --max-depth
+DEEPEST_FRONT_END = 200_000
+# the limit python started with, for code that recurses in C
+DEFAULT_RECURSION_LIMIT = sys.getrecursionlimit()
 
 
 class Lox:
     has_error = False
     has_runtime_error = False
+    scanner: type
+    parser: type
+    compact_tokens = False
+    optimize = False
+    cache: "ProgramCache | None" = None
+    engine: "Callable[[Output], Any]"
 
     @classmethod
     def main(cls):
-        cls.interpreter = Interpreter()
-
-        if len(sys.argv) == 1:
-            cls.run_prompt()
-        elif len(sys.argv) == 2:
-            cls.run_file(sys.argv[1])
-        elif len(sys.argv) == 3 and sys.argv[2] == "printer":
-            cls.printer(sys.argv[1])
+        parser = argparse.ArgumentParser(prog="jlox")
+        parser.add_argument("script", nargs="?")
+        parser.add_argument("mode", nargs="?", choices=["printer"])
+        parser.add_argument(
+            "--engine",
+            choices=ENGINES.keys(),
+            default="tree",
+            help="execution engine: tree walking visitor, compiled closures, bytecode "
+            "vm or non recursive tree walker",
+        )
+        parser.add_argument(
+            "--scanner",
+            choices=SCANNERS.keys(),
+            default="classic",
+            help="character by character scanner or single master regex scanner",
+        )
+        parser.add_argument(
+            "--parser",
+            choices=PARSERS.keys(),
+            default="recursive",
+            help="recursive descent or precedence climbing expression parser, "
+            "both build the same trees",
+        )
+        parser.add_argument(
+            "--max-depth",
+            type=int,
+            metavar="FRAMES",
+            help="pending frames allowed with --engine stack before it reports "
+            f"a stack overflow, defaults to {DEFAULT_MAX_DEPTH}",
+        )
+        parser.add_argument(
+            "--stream",
+            action="store_true",
+            help="execute each top level declaration as soon as it is parsed",
+        )
+        parser.add_argument(
+            "--watch",
+            action="store_true",
+            help="run the script again whenever it changes, reparsing only "
+            "the declarations that were edited",
+        )
+        parser.add_argument(
+            "--compact-tokens",
+            action="store_true",
+            help="keep scanned tokens in a struct of arrays buffer, slower to parse",
+        )
+        parser.add_argument(
+            "-O",
+            "--optimize",
+            action="store_true",
+            help="fold constants and drop dead branches before running",
+        )
+        parser.add_argument(
+            "--no-cache",
+            action="store_true",
+            help="always scan and parse instead of using the program cache",
+        )
+        parser.add_argument(
+            "--profile",
+            action="store_true",
+            help="sample the executing lox line and print a hot list on exit",
+        )
+        parser.add_argument(
+            "--profile-output",
+            metavar="FILE",
+            help="also write folded stacks for flamegraph tools to FILE",
+        )
+        parser.add_argument(
+            "--profile-interval", type=float, default=0.001, metavar="SECONDS"
+        )
+        parser.add_argument(
+            "--stats",
+            metavar="FILE",
+            help="count executed nodes, scopes and lookups and write them as json",
+        )
+        parser.add_argument(
+            "--memstats",
+            action="store_true",
+            help="trace memory through scanning, parsing and interpreting and "
+            "print peak and retained bytes per phase on exit",
+        )
+        parser.add_argument(
+            "--memstats-output",
+            metavar="FILE",
+            help="also write the memory report as json to FILE",
+        )
+        parser.add_argument(
+            "--flush",
+            choices=FLUSH_POLICIES,
+            help="when printed output is written out, defaults to line for the "
+            "prompt and size otherwise",
+        )
+        parser.add_argument(
+            "--output-buffer",
+            type=int,
+            default=DEFAULT_BUFFER_SIZE,
+            metavar="CHARS",
+            help="pending output that triggers a write with --flush size",
+        )
+        args = parser.parse_args()
+        if args.profile and args.engine != "tree":
+            parser.error("--profile needs --engine tree")
+        if args.stats and args.engine != "tree":
+            parser.error("--stats needs --engine tree")
+        if args.max_depth is not None and args.engine != "stack":
+            parser.error("--max-depth needs --engine stack")
+        if args.max_depth is not None and args.max_depth < 1:
+            parser.error("--max-depth must be at least 1")
+        if args.memstats and (args.script is None or args.stream or args.watch):
+            parser.error("--memstats needs a script and runs it whole")
+        if args.stream and args.parser != "recursive":
+            parser.error("--stream always uses the recursive parser")
+        if args.compact_tokens and (args.script is None or args.stream or args.watch):
+            # streaming, the prompt and watch mode scan into token lists of
+            # their own
+            parser.error("--compact-tokens needs a script and scans it whole")
+
+        policy = args.flush or ("line" if args.script is None else "size")
+        output = Output(buffer_size=args.output_buffer, policy=policy)
+        if args.stats:
+            cls.engine = InstrumentedInterpreter
+        elif args.max_depth is not None:
+            cls.engine = partial(StackInterpreter, max_depth=args.max_depth)
         else:
-            print("Usage: jlox [script]")
-            sys.exit(0)
+            cls.engine = ENGINES[args.engine]
+        cls.interpreter = cls.engine(output)
+        if args.engine == "stack":
+            # scanning, parsing and resolving still recurse, up to a dozen
+            # python frames per level of nesting with the recursive parser.
+            # python 3.11 keeps those frames off the C stack, so give the
+            # front end room for whatever the engine can run, within reason
+            limit = min(FRONT_END_FRAMES * cls.interpreter.max_depth, DEEPEST_FRONT_END)
+            sys.setrecursionlimit(max(sys.getrecursionlimit(), limit))
+        cls.scanner = SCANNERS[args.scanner]
+        cls.parser = PARSERS[args.parser]
+        cls.compact_tokens = args.compact_tokens
+        cls.optimize = args.optimize
+        if not args.no_cache:
+            cls.cache = ProgramCache()
+
+        profiler = None
+        if args.profile:
+            profiler = SamplingProfiler(args.profile_interval)
+            profiler.start()
+        try:
+            if args.script is None:
+                cls.run_prompt()
+            elif args.mode == "printer":
+                cls.printer(args.script)
+            elif args.memstats:
+                cls.run_memstats(args.script, args.memstats_output)
+            elif args.watch:
+                cls.watch_file(args.script)
+            else:
+                cls.run_file(args.script, args.stream)
+        finally:
+            if args.stats:
+                with open(args.stats, "w") as out:
+                    cls.interpreter.dump(out)
+            if profiler is not None:
+                profiler.stop()
+                profiler.report(sys.stderr)
+                if args.profile_output:
+                    with open(args.profile_output, "w") as out:
+                        profiler.write_folded(out)
 
     @classmethod
     def printer(cls, path: str) -> str:
         source = open(path, "r").read()
-        scanner = Scanner(source.strip())
-        tokens = scanner.scan_tokens()
-        statements = Parser(tokens).parse()
+        tokens = cls.scan(source)
+        statements = cls.parser(tokens).parse()
+        if cls.optimize and not cls.has_error:
+            statements = Optimizer().optimize(statements)
         statements_print = AstPrinter().print_statements(statements)
         print('\n'.join(statements_print))
 
     @classmethod
-    def run_file(cls, path: str):
+    def run_file(cls, path: str, stream: bool = False):
+        source = open(path, "r").read()
+        if stream:
+            cls.run_stream(source)
+        elif cls.cache is not None:
+            cls.run_cached(source, cls.cache)
+        else:
+            cls.run(source)
+
+    @classmethod
+    def run_memstats(cls, path: str, output: str | None = None):
+        # always scans and parses, the program cache would skip both phases
         source = open(path, "r").read()
-        cls.run(source)
+        memstats = MemoryStats()
+        try:
+            memstats.run(source)
+        finally:
+            memstats.report(sys.stderr)
+            if output:
+                with open(output, "w") as out:
+                    memstats.dump(out)
+
+    @classmethod
+    def watch_file(cls, path: str, interval: float = 0.2):
+        parser = IncrementalParser()
+        seen = None
+        try:
+            while True:
+                try:
+                    mtime = os.stat(path).st_mtime_ns
+                except FileNotFoundError:
+                    mtime = None
+                if mtime is not None and mtime != seen:
+                    seen = mtime
+                    source = open(path, "r").read()
+                    cls.reset()
+                    # every run starts from empty globals
+                    cls.interpreter = cls.engine(cls.interpreter.output)
+                    try:
+                        start = time.perf_counter()
+                        statements = parser.parse(source)
+                        parsed = time.perf_counter() - start
+                        cls.run_parsed(statements)
+                    except Exception as e:
+                        # the script crashing the interpreter does not end
+                        # the watch, the next edit may fix it
+                        print(f"[watch] run failed: {e!r}", file=sys.stderr)
+                    else:
+                        print(
+                            f"[watch] {parser.parsed} declarations parsed, "
+                            f"{parser.reused} reused in {parsed * 1000:.1f}ms",
+                            file=sys.stderr,
+                        )
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            return
 
     @classmethod
     def run_prompt(cls):
+        # lines are collected until they form complete declarations. the
+        # session is parsed as one growing source, so the entries typed before
+        # are reused rather than parsed again, and only the new statements run
+        parser = IncrementalParser()
+        history = ""
+        ran = 0
+        source = ""
         while True:
-            print("> ", end="")
-            line = input()
-            if len(line) == 0:
+            print("... " if source else "> ", end="")
+            try:
+                line = input()
+            except EOFError:
+                return
+            if len(line) == 0 and not source:
                 return
-            cls.run(line)
-            cls.has_error = False
+            source += line + "\n"
+            # an empty line gives up on an unbalanced entry, it is parsed as
+            # it stands and reported like any other syntax error
+            if line and not is_complete(source):
+                continue
+            if joins_previous(history, source):
+                # an else would join the if entered before it, on its own
+                # it is an error
+                parser.parse_span(source, history.count("\n") + 1)
+            else:
+                statements = parser.parse(history + source)
+                if not cls.has_error:
+                    history += source
+                    source = ""
+                    cls.run_parsed(statements[ran:])
+                    ran = len(statements)
+            # an entry with syntax errors is left out so it is not reported
+            # again, its lines are kept blank to number the later ones
+            history += "\n" * source.count("\n")
+            source = ""
+            cls.reset()
+
+    @classmethod
+    def scan(cls, source: str) -> List[Token] | TokenBuffer:
+        scanner = cls.scanner(source.strip())
+        if cls.compact_tokens:
+            return TokenBuffer(scanner.iter_tokens())
+        return scanner.scan_tokens()
+
+    @classmethod
+    def prepare(cls, source: str) -> List[Stmt]:
+        tokens = cls.scan(source)
+        parser = cls.parser(tokens)
+        try:
+            statements = parser.parse()
+        except RecursionError:
+            # nested deeper than the python stack allows, report it where the
+            # parser gave up instead of dumping a traceback
+            cls.error(parser.peek(), "Too much nesting.")
+        if cls.has_error:
+            sys.exit(65)
+
+        try:
+            Resolver().resolve(statements)
+        except RecursionError:
+            # the resolver takes more frames per level than the parser
+            cls.error(parser.peek(), "Too much nesting.")
+        if cls.has_error:
+            sys.exit(65)
+
+        # dead branches are resolved before they are dropped, so -O reports
+        # the same errors as a plain run
+        if cls.optimize:
+            statements = Optimizer().optimize(statements)
+        return statements
+
+    @classmethod
+    def execute(cls, statements: List[Stmt]):
+        # engines only flush ahead of a runtime error, the rest is written
+        # once the whole program has run
+        try:
+            cls.interpreter.interpret(statements)
+        finally:
+            cls.interpreter.output.flush()
+        if cls.has_error:
+            sys.exit(65)
 
     @classmethod
     def run(cls, source: str):
-        scanner = Scanner(source.strip())
-        tokens = scanner.scan_tokens()
-        statements = Parser(tokens).parse()
-        cls.interpreter.interpret(statements)
+        cls.execute(cls.prepare(source))
+
+    @classmethod
+    def run_parsed(cls, statements: List[Stmt]):
+        # like run but errors are only reported, for the prompt and watch mode
+        if cls.has_error:
+            return
+        Resolver().resolve(statements)
+        if cls.has_error:
+            return
+        if cls.optimize:
+            statements = Optimizer().optimize(statements)
+        try:
+            cls.interpreter.interpret(statements)
+        finally:
+            cls.interpreter.output.flush()
+
+    @classmethod
+    def run_cached(cls, source: str, cache: "ProgramCache"):
+        key = cache.key(source, cls.optimize)
+        statements = cache.load(key)
+        if statements is None:
+            statements = cls.prepare(source)
+            # pickling recurses in C. under the limit raised for the front
+            # end a deep tree overflows the native stack, under the default
+            # one it raises RecursionError and is just not cached
+            limit = sys.getrecursionlimit()
+            sys.setrecursionlimit(DEFAULT_RECURSION_LIMIT)
+            try:
+                cache.store(key, statements)
+            finally:
+                sys.setrecursionlimit(limit)
+        cls.execute(statements)
+
+    @classmethod
+    def run_stream(cls, source: str):
+        # side effects start with the first declaration, so once an error is
+        # found nothing more runs but the rest is still parsed for diagnostics
+        tokens = cls.scanner(source.strip()).iter_tokens()
+        resolver = Resolver()
+        try:
+            for statement in StreamParser(tokens).declarations():
+                if cls.has_error or cls.has_runtime_error:
+                    continue
+                statements = [statement]
+                resolver.resolve(statements)
+                if cls.has_error:
+                    continue
+                if cls.optimize:
+                    statements = Optimizer().optimize(statements)
+                # output goes out as the flush policy asks, not per declaration
+                cls.interpreter.interpret(statements)
+        finally:
+            cls.interpreter.output.flush()
 
         if cls.has_error:
             sys.exit(65)
 
+    @classmethod
+    def reset(cls):
+        cls.has_error = False
+        cls.has_runtime_error = False
+
     @classmethod
     def runtime_error(cls, error: RuntimeError):
-        print(f"{error.message}\n[line {error.token.line}]")
+        print(f"{error.message}\n[line {error.line}]")
         cls.has_runtime_error = True
 
     @classmethod
@@ -80,6 +437,45 @@ class Lox:
         cls.has_error = True
 
 
+from output import DEFAULT_BUFFER_SIZE
+from output import FLUSH_POLICIES
+from output import Output
+from scanner import RegexScanner
 from scanner import Scanner
 from parsers import Parser
+from parsers import PrattParser
+from parsers import StreamParser
+from incremental import IncrementalParser
+from incremental import is_complete
+from incremental import joins_previous
+from resolver import Resolver
+from optimizer import Optimizer
+from cache import ProgramCache
 from interpreter import Interpreter
+from closure_compiler import ClosureInterpreter
+from vm import VM
+from stack_interpreter import DEFAULT_MAX_DEPTH
+from stack_interpreter import StackInterpreter
+from profiler import SamplingProfiler
+from instrumented import InstrumentedInterpreter
+from memstats import MemoryStats
+
+SCANNERS = {
+    "classic": Scanner,
+    "regex": RegexScanner,
+}
+Lox.scanner = Scanner
+
+PARSERS = {
+    "recursive": Parser,
+    "pratt": PrattParser,
+}
+Lox.parser = Parser
+
+ENGINES = {
+    "tree": Interpreter,
+    "closure": ClosureInterpreter,
+    "vm": VM,
+    "stack": StackInterpreter,
+}
+Lox.engine = Interpreter
@@ -0,0 +1,196 @@
+import gc
+import json
+import os
+import sys
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from enum import Enum
+from typing import Any, Dict, List, TextIO
+
+from environment import Environment
+from lox import Lox, Optimizer, Resolver
+from quickening import base_class
+
+# classes counted by the object census, everything the front end and the
+# engines allocate per program lives in these modules
+CENSUS_MODULES = {
+    "tokens",
+    "expr",
+    "stmt",
+    "quickening",
+    "environment",
+    "rope",
+    "chunk",
+}
+SITES = 5
+
+
+def census() -> Dict[str, Dict[str, int]]:
+    # bytes are each object's own size (and its instance dict), not what it
+    # points to, so a Token does not include its lexeme. quickened nodes are
+    # counted as the node class they specialize
+    counts = Counter()
+    sizes = Counter()
+    for obj in gc.get_objects():
+        cls = type(obj)
+        if cls.__module__ not in CENSUS_MODULES or isinstance(obj, Enum):
+            continue
+        cls = base_class(cls)
+        name = f"{cls.__module__}.{cls.__qualname__}"
+        counts[name] += 1
+        sizes[name] += sys.getsizeof(obj)
+        if hasattr(obj, "__dict__"):
+            sizes[name] += sys.getsizeof(obj.__dict__)
+    return {
+        name: {"count": count, "bytes": sizes[name]}
+        for name, count in sorted(counts.items(), key=lambda item: -sizes[item[0]])
+    }
+
+
+def allocation_sites(
+    before: tracemalloc.Snapshot, after: tracemalloc.Snapshot
+) -> List[Dict[str, Any]]:
+    # filter_traces is slow on big programs, drop the tracing overhead from
+    # the grouped statistics instead
+    ignore = {tracemalloc.__file__, __file__}
+    sites = []
+    # sorted by how much each site changed, sites that freed memory are
+    # mixed in with the ones that kept it
+    for stat in after.compare_to(before, "lineno"):
+        if len(sites) == SITES:
+            break
+        frame = stat.traceback[0]
+        if stat.size_diff <= 0 or frame.filename in ignore:
+            continue
+        sites.append(
+            {
+                "site": f"{os.path.basename(frame.filename)}:{frame.lineno}",
+                "bytes": stat.size_diff,
+                "count": stat.count_diff,
+            }
+        )
+    return sites
+
+
+@contextmanager
+def counting(cls: type, allocated: Dict[str, Dict[str, int]]):
+    # counts instances of cls as they are created, for objects a census would
+    # miss because they are freed again before the phase ends
+    init = cls.__init__
+    entry = {"count": 0, "bytes": 0}
+    allocated[f"{cls.__module__}.{cls.__qualname__}"] = entry
+
+    def counted(self, *args):
+        init(self, *args)
+        entry["count"] += 1
+        entry["bytes"] += sys.getsizeof(self)
+
+    cls.__init__ = counted
+    try:
+        yield
+    finally:
+        cls.__init__ = init
+
+
+class MemoryStats:
+    # runs a script phase by phase under tracemalloc. peak is the most memory
+    # the phase had allocated at once on top of what existed when it began,
+    # retained what it still held at the end. after each phase the live lox
+    # objects are counted by class. environments only live as long as their
+    # block, those are counted as interpreting creates them. tracing slows
+    # everything down several times, only the byte counts are meaningful
+    phases: Dict[str, Dict[str, Any]]
+    objects: Dict[str, Dict[str, Dict[str, int]]]
+    allocated: Dict[str, Dict[str, Dict[str, int]]]
+
+    def __init__(self):
+        self.phases = {}
+        self.objects = {}
+        self.allocated = {"interpret": {}}
+
+    @contextmanager
+    def phase(self, name: str):
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        start, _ = tracemalloc.get_traced_memory()
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            self.phases[name] = {
+                "peak": peak - start,
+                "retained": current - start,
+                "sites": allocation_sites(snapshot, tracemalloc.take_snapshot()),
+            }
+
+    def run(self, source: str):
+        # the same steps as Lox.prepare and Lox.execute, one phase each
+        tracemalloc.start()
+        try:
+            with self.phase("scan"):
+                tokens = Lox.scan(source)
+            self.objects["scan"] = census()
+
+            with self.phase("parse"):
+                statements = Lox.parser(tokens).parse()
+            # a normal run lets go of the token list once it is parsed
+            del tokens
+            self.objects["parse"] = census()
+            if Lox.has_error:
+                sys.exit(65)
+
+            with self.phase("resolve"):
+                Resolver().resolve(statements)
+                if Lox.optimize and not Lox.has_error:
+                    statements = Optimizer().optimize(statements)
+            if Lox.has_error:
+                sys.exit(65)
+
+            with self.phase("interpret"), counting(
+                Environment, self.allocated["interpret"]
+            ):
+                Lox.interpreter.interpret(statements)
+                Lox.interpreter.output.flush()
+            self.objects["interpret"] = census()
+        finally:
+            tracemalloc.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "phases": self.phases,
+            "objects": self.objects,
+            "allocated": self.allocated,
+        }
+
+    def report(self, out: TextIO, limit: int = 10):
+        print(f"\n{'phase':<10} {'peak':>12} {'retained':>12}", file=out)
+        for name, phase in self.phases.items():
+            print(f"{name:<10} {phase['peak']:>12,} {phase['retained']:>12,}", file=out)
+        for name, phase in self.phases.items():
+            if phase["sites"]:
+                print(f"\nretained by {name}", file=out)
+                print(f"  {'site':<32} {'bytes':>12} {'blocks':>9}", file=out)
+                for site in phase["sites"]:
+                    print(
+                        f"  {site['site']:<32} {site['bytes']:>12,} {site['count']:>9,}",
+                        file=out,
+                    )
+        tables = [
+            (f"live after {name}", objects) for name, objects in self.objects.items()
+        ]
+        tables += [
+            (f"allocated during {name}", objects)
+            for name, objects in self.allocated.items()
+        ]
+        for title, objects in tables:
+            print(f"\n{title}", file=out)
+            print(f"  {'class':<32} {'count':>9} {'bytes':>12}", file=out)
+            for cls, entry in list(objects.items())[:limit]:
+                print(
+                    f"  {cls:<32} {entry['count']:>9,} {entry['bytes']:>12,}", file=out
+                )
+
+    def dump(self, out: TextIO):
+        json.dump(self.stats(), out, indent=2)
+        out.write("\n")
@@ -0,0 +1,148 @@
+from typing import List
+
+import sys
+
+import expr
+import stmt
+from expr import Literal
+from stmt import Block
+from token_type import TokenType
+
+# folding a node must give exactly what the interpreter would compute, so
+# anything that raises at runtime is left in place: type errors are still
+# reported with their line, and division by zero still fails the same way
+# it does without -O
+NUMBER_OPERATORS = {
+    TokenType.MINUS: lambda a, b: a - b,
+    TokenType.STAR: lambda a, b: a * b,
+    TokenType.SLASH: lambda a, b: a / b,
+    TokenType.GREATER: lambda a, b: a > b,
+    TokenType.GREATER_EQUAL: lambda a, b: a >= b,
+    TokenType.LESS: lambda a, b: a < b,
+    TokenType.LESS_EQUAL: lambda a, b: a <= b,
+}
+
+
+def is_true(obj: object) -> bool:
+    return obj is not None and obj is not False
+
+
+def is_equal(a: object, b: object) -> bool:
+    return type(a) is type(b) and a == b
+
+
+class Optimizer(stmt.Visitor, expr.Visitor):
+    # runs after the resolver, so errors in dead branches are still reported.
+    # nodes that are kept hold on to their depths and slots, and the empty
+    # blocks put in place of dropped branches are elided like any block
+    # without declarations
+    def optimize(self, statements: List[stmt.Stmt]) -> List[stmt.Stmt]:
+        optimized = []
+        for statement in statements:
+            statement = statement.accept(self)
+            if statement is not None:
+                optimized.append(statement)
+        return optimized
+
+    def visit_block_stmt(self, stmt: stmt.Block) -> stmt.Stmt:
+        # blocks are kept even when empty, they still introduce a scope
+        stmt.statements = self.optimize(stmt.statements)
+        return stmt
+
+    def visit_expression_stmt(self, stmt: stmt.Expression) -> stmt.Stmt | None:
+        stmt.expression = stmt.expression.accept(self)
+        if type(stmt.expression) is Literal:
+            return None
+        return stmt
+
+    def visit_print_stmt(self, stmt: stmt.Print) -> stmt.Stmt:
+        stmt.expression = stmt.expression.accept(self)
+        return stmt
+
+    def visit_var_stmt(self, stmt: stmt.Var) -> stmt.Stmt:
+        if stmt.initializer is not None:
+            stmt.initializer = stmt.initializer.accept(self)
+        return stmt
+
+    def visit_if_stmt(self, stmt: stmt.If) -> stmt.Stmt | None:
+        stmt.condition = stmt.condition.accept(self)
+        if type(stmt.condition) is Literal:
+            if is_true(stmt.condition.value):
+                return stmt.then_branch.accept(self)
+            if stmt.else_branch is not None:
+                return stmt.else_branch.accept(self)
+            return None
+
+        stmt.then_branch = stmt.then_branch.accept(self) or Block([])
+        if stmt.else_branch is not None:
+            stmt.else_branch = stmt.else_branch.accept(self)
+        return stmt
+
+    def visit_while_stmt(self, stmt: stmt.While) -> stmt.Stmt | None:
+        stmt.condition = stmt.condition.accept(self)
+        if type(stmt.condition) is Literal and not is_true(stmt.condition.value):
+            return None
+        stmt.body = stmt.body.accept(self) or Block([])
+        return stmt
+
+    def visit_binary_expr(self, expr: expr.Binary) -> expr.Expr:
+        expr.left = expr.left.accept(self)
+        expr.right = expr.right.accept(self)
+        if type(expr.left) is not Literal or type(expr.right) is not Literal:
+            return expr
+
+        left = expr.left.value
+        right = expr.right.value
+        operator = expr.operator.type
+        if operator == TokenType.EQUAL_EQUAL:
+            return Literal(is_equal(left, right), expr.operator)
+        if operator == TokenType.BANG_EQUAL:
+            return Literal(not is_equal(left, right), expr.operator)
+        if operator == TokenType.PLUS:
+            if type(left) is float and type(right) is float:
+                return Literal(left + right, expr.operator)
+            if type(left) is str and type(right) is str:
+                return Literal(sys.intern(left + right), expr.operator)
+            return expr
+        if type(left) is not float or type(right) is not float:
+            return expr
+        if operator == TokenType.SLASH and right == 0:
+            return expr
+        return Literal(NUMBER_OPERATORS[operator](left, right), expr.operator)
+
+    def visit_grouping_expr(self, expr: expr.Grouping) -> expr.Expr:
+        return expr.expression.accept(self)
+
+    def visit_literal_expr(self, expr: expr.Literal) -> expr.Expr:
+        return expr
+
+    def visit_logical_expr(self, expr: expr.Logical) -> expr.Expr:
+        expr.left = expr.left.accept(self)
+        expr.right = expr.right.accept(self)
+        if type(expr.left) is not Literal:
+            return expr
+
+        left_true = is_true(expr.left.value)
+        if expr.operator.type == TokenType.OR:
+            return expr.left if left_true else expr.right
+        return expr.right if left_true else expr.left
+
+    def visit_unary_expr(self, expr: expr.Unary) -> expr.Expr:
+        expr.right = expr.right.accept(self)
+        if type(expr.right) is not Literal:
+            return expr
+
+        value = expr.right.value
+        if expr.operator.type == TokenType.BANG:
+            return Literal(not is_true(value), expr.operator)
+        if type(value) is float:
+            return Literal(-value, expr.operator)
+        return expr
+
+    def visit_variable_expr(self, expr: expr.Variable) -> expr.Expr:
+        return expr
+
+    def visit_assign_expr(self, expr: expr.Assign) -> expr.Expr:
+        expr.value = expr.value.accept(self)
+        return expr
+
@@ -0,0 +1,83 @@
+import math
+import sys
+from typing import List, TextIO
+
+DEFAULT_BUFFER_SIZE = 64 * 1024
+# size: write out once buffer_size characters are pending
+# exit: only when the engine finishes (or reports a runtime error)
+# line: after every print, for the interactive prompt
+FLUSH_POLICIES = ["size", "exit", "line"]
+
+
+def stringify(value: object) -> str:
+    if value is None:
+        return "nil"
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    if type(value) is float:
+        if value.is_integer():
+            if value == 0 and math.copysign(1.0, value) < 0:
+                return "-0"
+            if abs(value) < 1e16:
+                return str(int(value))
+        elif math.isnan(value):
+            return "NaN"
+        elif math.isinf(value):
+            return "Infinity" if value > 0 else "-Infinity"
+        return repr(value)
+    return str(value)
+
+
+class Output:
+    # print statements append stringified values here instead of going
+    # through the builtin print, which takes the text layer (and flushes
+    # per line on a tty) for every call. pending text is encoded once per
+    # flush and written to the binary buffer under the stream
+    stream: TextIO | None
+    buffer_size: int
+    policy: str
+
+    def __init__(
+        self,
+        stream: TextIO | None = None,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        policy: str = "size",
+    ):
+        # None writes to whatever sys.stdout is when flushing
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self.policy = policy
+        self.parts: List[str] = []
+        self.size = 0
+        if policy == "line":
+            self.limit = 0
+        elif policy == "exit":
+            self.limit = math.inf
+        else:
+            self.limit = buffer_size
+
+    def print(self, value: object):
+        text = stringify(value)
+        self.parts.append(text)
+        self.size += len(text) + 1
+        if self.size >= self.limit:
+            self.flush()
+
+    def flush(self):
+        if not self.parts:
+            return
+        text = "\n".join(self.parts) + "\n"
+        self.parts = []
+        self.size = 0
+
+        stream = sys.stdout if self.stream is None else self.stream
+        buffer = getattr(stream, "buffer", None)
+        if buffer is None:
+            stream.write(text)
+            return
+        # whatever python already printed through the text layer goes first
+        stream.flush()
+        buffer.write(text.encode(stream.encoding or "utf-8"))
+        buffer.flush()
@@ -1,4 +1,6 @@
 from typing import cast
+from typing import Dict
+from typing import Iterator
 from typing import List
 
 from expr import *
@@ -6,6 +8,7 @@ from lox import Lox
 from stmt import *
 from token_type import TokenType
 from tokens import Token
+from tokens import TokenBuffer
 
 
 class ParseError(Exception):
@@ -13,10 +16,10 @@ class ParseError(Exception):
 
 
 class Parser:
-    tokens: List[Token]
+    tokens: List[Token] | TokenBuffer
     current: int
 
-    def __init__(self, tokens: List[Token]):
+    def __init__(self, tokens: List[Token] | TokenBuffer):
         self.tokens = tokens
         self.current = 0
 
@@ -54,7 +57,7 @@ class Parser:
             return self.while_statement()
         if self.match(TokenType.LEFT_BRACE):
             statements = self.block()
-            return Block(statements)
+            return Block(statements, end=self.previous())
         return self.expression_statement()
 
     def for_statement(self) -> Stmt:
@@ -65,7 +68,7 @@ class Parser:
         elif self.match(TokenType.VAR):
             initializer = self.var_declaration()
         else:
-            initializer = self.expression()
+            initializer = self.expression_statement()
 
         condition = None
         if not self.check(TokenType.SEMICOLON):
@@ -78,13 +81,14 @@ class Parser:
         self.consume(TokenType.RIGHT_PAREN, "Except ')' after loop condition.")
 
         body = self.statement()
+        end = self.previous()
 
         if increment is not None:
-            body = Block([body, increment])
+            body = Block([body, Expression(increment)])
 
         if condition is None:
             condition = Literal(True)
-        body = While(condition, body)
+        body = While(condition, body, end)
 
         if initializer is not None:
             body = Block([initializer, body])
@@ -106,7 +110,7 @@ class Parser:
         condition = self.expression()
         self.consume(TokenType.RIGHT_PAREN, "Except ')' after condition.")
         body = self.statement()
-        return While(condition, body)
+        return While(condition, body, self.previous())
 
     def block(self) -> List[Stmt]:
         statements = []
@@ -116,9 +120,10 @@ class Parser:
         return statements
 
     def print_statement(self) -> Stmt:
+        keyword = self.previous()
         value = self.expression()
         self.consume(TokenType.SEMICOLON, 'Except ";" after value.')
-        return Print(value)
+        return Print(value, keyword)
 
     def expression_statement(self) -> Stmt:
         value = self.expression()
@@ -201,14 +206,14 @@ class Parser:
 
     def primary(self) -> Expr:
         if self.match(TokenType.FALSE):
-            return Literal(False)
+            return Literal(False, self.previous())
         if self.match(TokenType.TRUE):
-            return Literal(True)
+            return Literal(True, self.previous())
         if self.match(TokenType.NIL):
-            return Literal(None)
+            return Literal(None, self.previous())
 
         if self.match(TokenType.NUMBER, TokenType.STRING):
-            return Literal(self.previous().literal)
+            return Literal(self.previous().literal, self.previous())
 
         if self.match(TokenType.IDENTIFIER):
             return Variable(self.previous())
@@ -272,3 +277,122 @@ class Parser:
             ]:
                 return
             self.advance()
+
+
+class StreamParser(Parser):
+    # pulls tokens lazily and only keeps the current and previous one alive
+    stream: Iterator[Token]
+    current_token: Token
+    previous_token: Token | None
+
+    def __init__(self, tokens: Iterator[Token]):
+        self.stream = tokens
+        self.current_token = next(tokens)
+        self.previous_token = None
+
+    def parse(self) -> List[Stmt]:
+        return list(self.declarations())
+
+    def declarations(self) -> Iterator[Stmt | None]:
+        while not self.is_at_end():
+            yield self.declaration()
+
+    def advance(self):
+        if not self.is_at_end():
+            self.previous_token = self.current_token
+            self.current_token = next(self.stream)
+        return self.previous()
+
+    def peek(self) -> Token:
+        return self.current_token
+
+    def previous(self) -> Token:
+        return cast(Token, self.previous_token)
+
+
+# binding power of every infix operator, higher binds tighter. assignment
+# sits below all of them and is handled separately since it is right
+# associative and needs its target checked
+BINARY_PRECEDENCE: Dict[TokenType, int] = {
+    TokenType.OR: 1,
+    TokenType.AND: 2,
+    TokenType.BANG_EQUAL: 3,
+    TokenType.EQUAL_EQUAL: 3,
+    TokenType.GREATER: 4,
+    TokenType.GREATER_EQUAL: 4,
+    TokenType.LESS: 4,
+    TokenType.LESS_EQUAL: 4,
+    TokenType.MINUS: 5,
+    TokenType.PLUS: 5,
+    TokenType.SLASH: 6,
+    TokenType.STAR: 6,
+}
+LOGICAL_OPERATORS = (TokenType.OR, TokenType.AND)
+KEYWORD_LITERALS = {
+    TokenType.FALSE: False,
+    TokenType.TRUE: True,
+    TokenType.NIL: None,
+}
+
+
+class PrattParser(Parser):
+    # statements are parsed as in Parser, expressions by precedence climbing
+    # over BINARY_PRECEDENCE: one call per operand instead of one per grammar
+    # level, reading tokens straight from the list. trees and errors are the
+    # same as the recursive descent ones
+    def expression(self) -> Expr:
+        return self.assignment()
+
+    def assignment(self) -> Expr:
+        expr = self.binary(1)
+        equals = self.tokens[self.current]
+        if equals.type == TokenType.EQUAL:
+            self.current += 1
+            value = self.assignment()
+            if type(expr) is Variable:
+                return Assign(expr.name, value)
+            self.error(equals, "invalid assignment target.")
+        return expr
+
+    def binary(self, min_precedence: int) -> Expr:
+        expr = self.unary()
+        tokens = self.tokens
+        while True:
+            operator = tokens[self.current]
+            precedence = BINARY_PRECEDENCE.get(operator.type, 0)
+            if precedence < min_precedence:
+                return expr
+            self.current += 1
+            # operators are left associative, the right operand only takes
+            # operators that bind tighter
+            right = self.binary(precedence + 1)
+            if operator.type in LOGICAL_OPERATORS:
+                expr = Logical(expr, operator, right)
+            else:
+                expr = Binary(expr, operator, right)
+
+    def unary(self) -> Expr:
+        operator = self.tokens[self.current]
+        if operator.type == TokenType.BANG or operator.type == TokenType.MINUS:
+            self.current += 1
+            return Unary(operator, self.unary())
+        return self.primary()
+
+    def primary(self) -> Expr:
+        token = self.tokens[self.current]
+        token_type = token.type
+        if token_type == TokenType.NUMBER or token_type == TokenType.STRING:
+            self.current += 1
+            return Literal(token.literal, token)
+        if token_type == TokenType.IDENTIFIER:
+            self.current += 1
+            return Variable(token)
+        if token_type in KEYWORD_LITERALS:
+            self.current += 1
+            return Literal(KEYWORD_LITERALS[token_type], token)
+        if token_type == TokenType.LEFT_PAREN:
+            self.current += 1
+            expr = self.expression()
+            self.consume(TokenType.RIGHT_PAREN, "Except ')' after expression.")
+            return Grouping(expr)
+        raise self.error(token, "Except expression.")
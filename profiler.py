@@ -0,0 +1,110 @@
+import sys
+import threading
+from collections import Counter
+from typing import Dict, List, TextIO, Tuple
+
+import expr
+import stmt
+from interpreter import Interpreter
+
+
+def node_line(node: object) -> int | None:
+    if isinstance(node, (expr.Binary, expr.Logical, expr.Unary)):
+        return node.operator.line
+    if isinstance(node, (expr.Variable, expr.Assign)):
+        return node.name.line
+    if isinstance(node, expr.Grouping):
+        return node_line(node.expression)
+    if isinstance(node, stmt.Var):
+        return node.name.line
+    if isinstance(node, (stmt.Print, stmt.Expression)):
+        return node_line(node.expression)
+    if isinstance(node, (stmt.If, stmt.While)):
+        return node_line(node.condition)
+    if isinstance(node, stmt.Block):
+        for statement in node.statements:
+            line = node_line(statement)
+            if line is not None:
+                return line
+    return None
+
+
+class SamplingProfiler:
+    # a background thread periodically inspects the python stack of the thread
+    # running the Interpreter and maps its visit_*_stmt frames back to lox
+    # statements, so the interpreter itself is not instrumented at all.
+    # python only hands the GIL over every sys.getswitchinterval() seconds,
+    # which bounds the effective sampling rate
+    interval: float
+    samples: int
+    lines: Counter
+    stacks: Counter
+
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.samples = 0
+        self.lines = Counter()
+        self.stacks = Counter()
+        self._names: Dict[int, Tuple[str, int | None]] = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._target = None
+
+    def start(self):
+        self._target = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is not None:
+                self.sample(frame)
+
+    def describe(self, node: stmt.Stmt) -> Tuple[str, int | None]:
+        # nodes live for the whole run, so their id is a stable cache key
+        key = id(node)
+        if key not in self._names:
+            kind = type(node).__name__.lower()
+            self._names[key] = (kind, node_line(node))
+        return self._names[key]
+
+    def sample(self, frame):
+        stack: List[Tuple[str, int | None]] = []
+        line = None
+        while frame is not None:
+            code = frame.f_code
+            if code.co_name.startswith("visit_") and isinstance(
+                frame.f_locals.get("self"), Interpreter
+            ):
+                if code.co_name.endswith("_stmt"):
+                    stack.append(self.describe(frame.f_locals["stmt"]))
+                elif line is None:
+                    line = node_line(frame.f_locals.get("expr"))
+            frame = frame.f_back
+        if not stack:
+            return
+
+        stack.reverse()
+        if line is None:
+            line = next((l for _, l in reversed(stack) if l is not None), None)
+        self.samples += 1
+        self.lines[line] += 1
+        folded = ";".join(f"{kind}@{'?' if l is None else l}" for kind, l in stack)
+        self.stacks[folded] += 1
+
+    def report(self, out: TextIO, limit: int = 20):
+        print(f"\n{self.samples} samples", file=out)
+        print(f"{'line':>6} {'samples':>8} {'share':>7}", file=out)
+        for line, count in self.lines.most_common(limit):
+            share = count / self.samples
+            print(f"{'?' if line is None else line:>6} {count:>8} {share:>7.1%}", file=out)
+
+    def write_folded(self, out: TextIO):
+        for stack, count in sorted(self.stacks.items()):
+            print(f"{stack} {count}", file=out)
@@ -0,0 +1,101 @@
+import io
+from contextlib import redirect_stderr
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, TextIO
+
+from lox import ENGINES, Lox, Optimizer, Resolver
+from rope import flatten
+from runtimeerror import RuntimeError
+
+
+class CompileError(Exception):
+    errors: List[str]
+
+    def __init__(self, errors: List[str]):
+        super().__init__("\n".join(errors))
+        self.errors = errors
+
+
+def to_lox(name: str, value: Any) -> Any:
+    # host values a program can be given, python (and json) integers become
+    # lox numbers and anything lox has no type for is refused up front
+    if type(value) is int:
+        return float(value)
+    if value is None or type(value) in (bool, float, str):
+        return value
+    raise TypeError(f"global {name!r} has unsupported type {type(value).__name__}")
+
+
+def lox_globals(globals: Dict[str, Any]) -> Dict[str, Any]:
+    return {name: to_lox(name, value) for name, value in globals.items()}
+
+
+@dataclass
+class Result:
+    # output is None when the program wrote to a sink given by the caller
+    output: str | None
+    globals: Dict[str, Any] = field(default_factory=dict)
+    error: RuntimeError | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class Program:
+    # holds one engine and the code it compiled, runs reuse both so the
+    # quickened nodes, closures or bytecode are kept warm between runs.
+    # a program is not reentrant, give each thread its own compile()
+    def __init__(self, engine: Any, code: Any):
+        self.engine = engine
+        self.code = code
+
+    def run(
+        self, globals: Dict[str, Any] | None = None, output: TextIO | None = None
+    ) -> Result:
+        engine = self.engine
+        if globals is not None:
+            globals = lox_globals(globals)
+        sink = io.StringIO() if output is None else output
+        # compiled code holds on to the engine's Output, point it at the sink
+        engine.output.stream = sink
+        # compiled closures hold on to the globals dict itself, refill it in place
+        values = engine.globals.values
+        values.clear()
+        if globals is not None:
+            values.update(globals)
+
+        result = Result(None)
+        try:
+            engine.run(self.code)
+        except RuntimeError as e:
+            result.error = e
+        finally:
+            engine.output.flush()
+            engine.output.stream = None
+
+        if output is None:
+            result.output = sink.getvalue()
+        result.globals = {name: flatten(value) for name, value in values.items()}
+        return result
+
+
+def compile(source: str, engine: str = "tree", optimize: bool = False) -> Program:
+    # the front end reports through Lox, collect what it prints instead of
+    # letting it reach stderr and raise it as a value
+    Lox.reset()
+    diagnostics = io.StringIO()
+    with redirect_stderr(diagnostics):
+        statements = Lox.parser(Lox.scan(source)).parse()
+        if not Lox.has_error:
+            Resolver().resolve(statements)
+        if not Lox.has_error:
+            if optimize:
+                statements = Optimizer().optimize(statements)
+            interpreter = ENGINES[engine]()
+            code = interpreter.compile(statements)
+
+    if Lox.has_error:
+        Lox.reset()
+        raise CompileError(diagnostics.getvalue().splitlines())
+    return Program(interpreter, code)
@@ -0,0 +1,167 @@
+from functools import cache
+from typing import Dict
+
+from expr import Binary
+from expr import Unary
+from rope import STRING_TYPES
+from token_type import TokenType
+
+# Specialized node classes the Interpreter rewrites Binary and Unary nodes into
+# after observing their operand types, by assigning node.__class__ in place.
+# They add no fields so the slot layout matches their base class; each
+# accept() goes straight to a fast path on the Interpreter that guards on the
+# operand types and falls back to the generic node kind when the guard fails.
+# Only the Interpreter produces and consumes them.
+
+
+class GenericBinary(Binary):
+    # saw more than one operand type combination, never specialized again
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visit_generic_binary_expr(self)
+
+
+class NumberAdd(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visit_number_add_expr(self)
+
+
+class StringConcat(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visit_string_concat_expr(self)
+
+
+class NumberSubtract(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visit_number_subtract_expr(self)
+
+
+class NumberMultiply(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visit_number_multiply_expr(self)
+
+
+class NumberDivide(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visit_number_divide_expr(self)
+
+
+class NumberGreater(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visit_number_greater_expr(self)
+
+
+class NumberGreaterEqual(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visit_number_greater_equal_expr(self)
+
+
+class NumberLess(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visit_number_less_expr(self)
+
+
+class NumberLessEqual(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visit_number_less_equal_expr(self)
+
+
+class Equal(Binary):
+    # equality works on any operands, so it never needs to de-specialize
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visit_equal_expr(self)
+
+
+class NotEqual(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visit_not_equal_expr(self)
+
+
+class GenericUnary(Unary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visit_generic_unary_expr(self)
+
+
+class NumberNegate(Unary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visit_number_negate_expr(self)
+
+
+class Not(Unary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visit_not_expr(self)
+
+
+NUMBER_BINARY: Dict[TokenType, type] = {
+    TokenType.PLUS: NumberAdd,
+    TokenType.MINUS: NumberSubtract,
+    TokenType.STAR: NumberMultiply,
+    TokenType.SLASH: NumberDivide,
+    TokenType.GREATER: NumberGreater,
+    TokenType.GREATER_EQUAL: NumberGreaterEqual,
+    TokenType.LESS: NumberLess,
+    TokenType.LESS_EQUAL: NumberLessEqual,
+}
+
+
+def specialize_binary(operator: TokenType, left: object, right: object) -> type:
+    if operator == TokenType.EQUAL_EQUAL:
+        return Equal
+    if operator == TokenType.BANG_EQUAL:
+        return NotEqual
+    if type(left) is float and type(right) is float:
+        return NUMBER_BINARY[operator]
+    if (
+        operator == TokenType.PLUS
+        and type(left) in STRING_TYPES
+        and type(right) in STRING_TYPES
+    ):
+        return StringConcat
+    return GenericBinary
+
+
+def specialize_unary(operator: TokenType, right: object) -> type:
+    if operator == TokenType.BANG:
+        return Not
+    if type(right) is float:
+        return NumberNegate
+    return GenericUnary
+
+
+@cache
+def base_class(cls: type) -> type:
+    # the parsed node class a quickened class stands in for, so counts do not
+    # depend on what ran before. any other class is its own base
+    for base in cls.__mro__:
+        if base.__module__ in ("expr", "stmt"):
+            return base
+    return cls
@@ -0,0 +1,138 @@
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+import expr
+import stmt
+from lox import Lox
+from stmt import Block
+from stmt import Var
+from tokens import Token
+
+
+def loop_scope(body: stmt.Stmt) -> Tuple[Block | None, List[stmt.Stmt]]:
+    # the block whose environment a loop can allocate once and reuse on every
+    # iteration, with the statements that run after it. lox has no closures,
+    # so nothing keeps an iteration's environment alive, and every slot is
+    # written by its var before it can be read. that covers a while body and
+    # the body of a for loop, which comes first in the block holding the
+    # increment
+    if type(body) is Block and body.size == 0 and body.statements:
+        first = body.statements[0]
+        if type(first) is Block and first.size:
+            return first, body.statements[1:]
+    if type(body) is Block and body.size:
+        return body, []
+    return None, []
+
+
+class Resolver(stmt.Visitor, expr.Visitor):
+    # every scope maps a name to its (slot, defined) pair, slots are handed
+    # out in declaration order so they match the runtime layout of the block
+    scopes: List[Dict[str, Tuple[int, bool]]]
+
+    def __init__(self):
+        self.scopes = []
+
+    def resolve(self, statements: List[stmt.Stmt]):
+        for statement in statements:
+            self.resolve_node(statement)
+
+    def resolve_node(self, node: stmt.Stmt | expr.Expr):
+        node.accept(self)
+
+    def begin_scope(self):
+        self.scopes.append({})
+
+    def end_scope(self):
+        self.scopes.pop()
+
+    def declare(self, name: Token) -> int | None:
+        if len(self.scopes) == 0:
+            return None
+        scope = self.scopes[-1]
+        if name.lexeme in scope:
+            Lox.error(name, "Already a variable with this name in this scope.")
+            return scope[name.lexeme][0]
+        slot = len(scope)
+        scope[name.lexeme] = (slot, False)
+        return slot
+
+    def define(self, name: Token):
+        if len(self.scopes) == 0:
+            return
+        scope = self.scopes[-1]
+        slot, _ = scope[name.lexeme]
+        scope[name.lexeme] = (slot, True)
+
+    def resolve_local(self, expr: expr.Variable | expr.Assign, name: Token):
+        for depth, scope in enumerate(reversed(self.scopes)):
+            if name.lexeme in scope:
+                expr.depth = depth
+                expr.slot = scope[name.lexeme][0]
+                return
+        # not found in any local scope, left unresolved and looked up as a global
+
+    def visit_block_stmt(self, stmt: stmt.Block):
+        if not any(type(statement) is Var for statement in stmt.statements):
+            # a block that declares nothing gets no scope, the engines run it
+            # in the enclosing environment (size 0) so depths skip it too
+            stmt.size = 0
+            self.resolve(stmt.statements)
+            return
+        self.begin_scope()
+        self.resolve(stmt.statements)
+        stmt.size = len(self.scopes[-1])
+        self.end_scope()
+
+    def visit_expression_stmt(self, stmt: stmt.Expression):
+        self.resolve_node(stmt.expression)
+
+    def visit_print_stmt(self, stmt: stmt.Print):
+        self.resolve_node(stmt.expression)
+
+    def visit_var_stmt(self, stmt: stmt.Var):
+        stmt.slot = self.declare(stmt.name)
+        if stmt.initializer is not None:
+            self.resolve_node(stmt.initializer)
+        self.define(stmt.name)
+
+    def visit_if_stmt(self, stmt: stmt.If):
+        self.resolve_node(stmt.condition)
+        self.resolve_node(stmt.then_branch)
+        if stmt.else_branch is not None:
+            self.resolve_node(stmt.else_branch)
+
+    def visit_while_stmt(self, stmt: stmt.While):
+        self.resolve_node(stmt.condition)
+        self.resolve_node(stmt.body)
+
+    def visit_binary_expr(self, expr: expr.Binary):
+        self.resolve_node(expr.left)
+        self.resolve_node(expr.right)
+
+    def visit_grouping_expr(self, expr: expr.Grouping):
+        self.resolve_node(expr.expression)
+
+    def visit_literal_expr(self, expr: expr.Literal):
+        pass
+
+    def visit_logical_expr(self, expr: expr.Logical):
+        self.resolve_node(expr.left)
+        self.resolve_node(expr.right)
+
+    def visit_unary_expr(self, expr: expr.Unary):
+        self.resolve_node(expr.right)
+
+    def visit_variable_expr(self, expr: expr.Variable):
+        if len(self.scopes) != 0:
+            local = self.scopes[-1].get(expr.name.lexeme)
+            if local is not None and not local[1]:
+                Lox.error(
+                    expr.name, "Can't read local variable in its own initializer."
+                )
+        self.resolve_local(expr, expr.name)
+
+    def visit_assign_expr(self, expr: expr.Assign):
+        self.resolve_node(expr.value)
+        self.resolve_local(expr, expr.name)
@@ -0,0 +1,78 @@
+from typing import List
+
+# results shorter than this stay plain str, copying them costs less than
+# the bookkeeping of a rope
+ROPE_THRESHOLD = 256
+
+
+class Rope:
+    # a lox string built by concatenation. ropes grown from each other share
+    # one parts list, a rope owns its first count entries. appending to the
+    # rope that owns the whole list (the tip) just extends the list, so a
+    # string grown in a loop costs linear time instead of copying the text
+    # on every step. the text is joined once, when it is first needed
+    __slots__ = ("parts", "count", "length", "flat")
+
+    parts: List[str]
+    count: int
+    length: int
+    flat: str | None
+
+    def __init__(self, parts: List[str], count: int, length: int):
+        self.parts = parts
+        self.count = count
+        self.length = length
+        self.flat = None
+
+    def __str__(self) -> str:
+        if self.flat is None:
+            self.flat = "".join(self.parts[: self.count])
+        return self.flat
+
+    def __eq__(self, other: object) -> bool:
+        return other.__class__ in STRING_TYPES and str(self) == str(other)
+
+    def __hash__(self) -> int:
+        return hash(str(self))
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __repr__(self) -> str:
+        return f"Rope({str(self)!r})"
+
+
+STRING_TYPES = (str, Rope)
+
+
+def concat(left: str | Rope, right: str | Rope) -> str | Rope:
+    if right.__class__ is Rope:
+        right = str(right)
+    if left.__class__ is Rope:
+        parts = left.parts
+        if left.count != len(parts):
+            # another string already grew from this one, fork a new list
+            parts = parts[: left.count]
+        parts.append(right)
+        return Rope(parts, left.count + 1, left.length + len(right))
+
+    length = len(left) + len(right)
+    if length < ROPE_THRESHOLD:
+        return left + right
+    return Rope([left, right], 2, length)
+
+
+def strings_equal(a: object, b: object) -> bool:
+    # equality between values of different classes, only a rope and a str
+    # holding the same text are equal
+    return (
+        a.__class__ in STRING_TYPES
+        and b.__class__ in STRING_TYPES
+        and str(a) == str(b)
+    )
+
+
+def flatten(value: object) -> object:
+    if value.__class__ is Rope:
+        return str(value)
+    return value
@@ -0,0 +1,221 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent
+TEST_DIR = ROOT / "test"
+# benchmarks are too slow for a conformance run, expressions and scanning only
+# make sense against the intermediate interpreters of the earlier chapters
+SKIPPED = {"benchmark", "expressions", "scanning"}
+
+# the comment conventions of the upstream test suite
+EXPECTED_OUTPUT = re.compile(r"// expect: ?(.*)")
+EXPECTED_ERROR = re.compile(r"// (Error.*)")
+ERROR_LINE = re.compile(r"// \[((java|c) )?line (\d+)\] (Error.*)")
+EXPECTED_RUNTIME_ERROR = re.compile(r"// expect runtime error: (.+)")
+NON_TEST = re.compile(r"// nontest")
+
+
+@dataclass
+class Test:
+    path: Path
+    output: List[str] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+    runtime_error: str | None = None
+    runtime_error_line: int = 0
+    exit_code: int = 0
+    annotated: bool = False
+
+
+@dataclass
+class Result:
+    test: Test
+    failures: List[str]
+    elapsed: float
+
+
+def parse_test(path: Path) -> Test | None:
+    test = Test(path)
+    for line_number, line in enumerate(path.read_text().splitlines(), 1):
+        if NON_TEST.search(line):
+            return None
+        if "// expect" in line or "Error" in line:
+            test.annotated = True
+
+        match = EXPECTED_OUTPUT.search(line)
+        if match:
+            test.output.append(match.group(1))
+            continue
+
+        match = EXPECTED_ERROR.search(line)
+        if match:
+            test.errors.append(f"[line {line_number}] {match.group(1)}")
+            test.exit_code = 65
+            continue
+
+        match = ERROR_LINE.search(line)
+        if match:
+            # errors tagged "c" are only reported by the bytecode implementation
+            if match.group(2) in (None, "java"):
+                test.errors.append(f"[line {match.group(3)}] {match.group(4)}")
+                test.exit_code = 65
+            continue
+
+        match = EXPECTED_RUNTIME_ERROR.search(line)
+        if match:
+            test.runtime_error = match.group(1)
+            test.runtime_error_line = line_number
+            test.exit_code = 70
+    return test
+
+
+def discover(filters: List[str]) -> List[Test]:
+    tests = []
+    for path in sorted(TEST_DIR.rglob("*.lox")):
+        relative = path.relative_to(TEST_DIR)
+        if filters:
+            if not any(str(relative).startswith(f) for f in filters):
+                continue
+        elif len(relative.parts) > 1 and relative.parts[0] in SKIPPED:
+            continue
+        test = parse_test(path)
+        if test is not None:
+            tests.append(test)
+    return tests
+
+
+def check(test: Test, stdout: str, stderr: str, exit_code: int) -> List[str]:
+    failures = []
+    output = stdout.splitlines()
+    errors = stderr.splitlines()
+    if not test.annotated:
+        # some files carry no expectations at all, they only have to run cleanly
+        if exit_code != 0 or errors:
+            failures.append(f"exit code {exit_code}: {' '.join(errors[:1])}")
+        return failures
+
+    if test.runtime_error is not None:
+        expected = [test.runtime_error, f"[line {test.runtime_error_line}]"]
+        if errors[:2] != expected:
+            failures.append(f"expected runtime error {expected}, got {errors[:2]}")
+    elif sorted(errors) != sorted(test.errors):
+        for error in test.errors:
+            if error not in errors:
+                failures.append(f"missing expected error: {error}")
+        for error in errors:
+            if error not in test.errors:
+                failures.append(f"unexpected error: {error}")
+
+    if exit_code != test.exit_code:
+        failures.append(f"expected exit code {test.exit_code}, got {exit_code}")
+
+    for index, expected in enumerate(test.output):
+        if index >= len(output):
+            failures.append(f"missing expected output: {expected}")
+            break
+        if output[index] != expected:
+            failures.append(f"expected output {expected!r}, got {output[index]!r}")
+            break
+    for line in output[len(test.output):]:
+        failures.append(f"unexpected output: {line}")
+        break
+    return failures
+
+
+def run_test(test: Test, command: List[str], timeout: float) -> Result:
+    start = time.perf_counter()
+    try:
+        process = subprocess.run(
+            command + [str(test.path)],
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+        )
+        failures = check(test, process.stdout, process.stderr, process.returncode)
+    except subprocess.TimeoutExpired:
+        failures = [f"timed out after {timeout}s"]
+    return Result(test, failures, time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the test/ corpus and check its // expect comments."
+    )
+    parser.add_argument(
+        "filters",
+        nargs="*",
+        help="only run tests whose path under test/ starts with one of these",
+    )
+    parser.add_argument("--engine", default="tree")
+    parser.add_argument("--scanner", default="classic")
+    parser.add_argument(
+        "-O",
+        "--optimize",
+        action="store_true",
+        help="run every test with the optimizer, the expectations do not change",
+    )
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count())
+    parser.add_argument(
+        "--timeout", type=float, default=10.0, help="seconds allowed per test"
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="list every failure reason"
+    )
+    args = parser.parse_args()
+
+    tests = discover([f.removeprefix("test/") for f in args.filters])
+    command = [
+        sys.executable,
+        str(ROOT / "main.py"),
+        "--engine",
+        args.engine,
+        "--scanner",
+        args.scanner,
+        "--no-cache",
+    ]
+    if args.optimize:
+        command.append("--optimize")
+
+    # every test is its own interpreter process, the threads only wait on them
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        results = list(pool.map(lambda t: run_test(t, command, args.timeout), tests))
+    elapsed = time.perf_counter() - start
+
+    directories: Dict[str, List[Result]] = defaultdict(list)
+    for result in results:
+        relative = result.test.path.relative_to(TEST_DIR)
+        directories[str(relative.parent)].append(result)
+
+    print(f"{'directory':<24} {'passed':>7} {'failed':>7} {'time':>8}")
+    for directory, group in sorted(directories.items()):
+        failed = sum(1 for result in group if result.failures)
+        total = sum(result.elapsed for result in group)
+        print(f"{directory:<24} {len(group) - failed:>7} {failed:>7} {total:>7.2f}s")
+
+    failed = [result for result in results if result.failures]
+    if failed:
+        print()
+        for result in failed:
+            print(f"FAIL {result.test.path.relative_to(ROOT)}")
+            reasons = result.failures if args.verbose else result.failures[:1]
+            for reason in reasons:
+                print(f"     {reason}")
+
+    print(
+        f"\n{len(results) - len(failed)} passed, {len(failed)} failed "
+        f"in {elapsed:.2f}s ({args.jobs} jobs)"
+    )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,8 @@
 from tokens import Token
 
 class RuntimeError(Exception) :
-    def __init__(self, token: Token,  message: str):
+    def __init__(self, token: Token | None,  message: str, line: int | None = None):
         super().__init__(message)
         self.message = message
         self.token = token
+        self.line = token.line if token is not None else line
@@ -1,3 +1,7 @@
+import re
+import sys
+from typing import Iterator
+
 from lox import Lox
 from token_type import TokenType
 from tokens import Token
@@ -29,12 +33,12 @@ class Scanner:
     current: int
     line: int
 
-    def __init__(self, source: str):
+    def __init__(self, source: str, line: int = 1):
         self.source = source
         self.tokens = []
         self.start = 0
         self.current = 0
-        self.line = 1
+        self.line = line
         
     def scan_tokens(self):
         while (not self.is_at_end()):
@@ -44,6 +48,15 @@ class Scanner:
         self.tokens.append(Token(TokenType.EOF, "", None, self.line))
         return self.tokens
 
+    def iter_tokens(self) -> Iterator[Token]:
+        while (not self.is_at_end()):
+            self.start = self.current
+            self.scan_token()
+            yield from self.tokens
+            self.tokens.clear()
+
+        yield Token(TokenType.EOF, "", None, self.line)
+
     def scan_token(self):
         c = self.advance()
         if   c == '(': self.add_token(TokenType.LEFT_PAREN)
@@ -80,7 +93,7 @@ class Scanner:
             self.identifier()
         elif c in [' ', '\r', '\t']:
             pass
-        elif '\n':
+        elif c == '\n':
             self.line += 1
         else: Lox.error_line(self.line, 'Unexpected character.')
             
@@ -110,7 +123,7 @@ class Scanner:
         return self.source[self.current + 1]
     
     def add_token(self, type: TokenType, literal=None):
-        text = self.source[self.start:self.current]
+        text = sys.intern(self.source[self.start:self.current])
         self.tokens.append(Token(type, text, literal, self.line))
         
     def string(self):
@@ -125,7 +138,8 @@ class Scanner:
         
         self.advance()
 
-        value = self.source[self.start + 1:self.current - 1]
+        # interned so equal literals compare by identity
+        value = sys.intern(self.source[self.start + 1:self.current - 1])
         self.add_token(TokenType.STRING, value)
 
     def is_digit(_self, c: str) -> bool:
@@ -154,3 +168,78 @@ class Scanner:
         type = keywords.get(text, TokenType.IDENTIFIER)
         self.add_token(type)
 
+
+operators = {
+    "(": TokenType.LEFT_PAREN,
+    ")": TokenType.RIGHT_PAREN,
+    "{": TokenType.LEFT_BRACE,
+    "}": TokenType.RIGHT_BRACE,
+    ",": TokenType.COMMA,
+    ".": TokenType.DOT,
+    "-": TokenType.MINUS,
+    "+": TokenType.PLUS,
+    ";": TokenType.SEMICOLON,
+    "*": TokenType.STAR,
+    "/": TokenType.SLASH,
+    "!": TokenType.BANG,
+    "!=": TokenType.BANG_EQUAL,
+    "=": TokenType.EQUAL,
+    "==": TokenType.EQUAL_EQUAL,
+    "<": TokenType.LESS,
+    "<=": TokenType.LESS_EQUAL,
+    ">": TokenType.GREATER,
+    ">=": TokenType.GREATER_EQUAL,
+}
+
+# one alternative per token class, the last one catches anything unexpected so
+# consecutive matches always cover the whole source
+token_pattern = re.compile(
+    r"""
+    (?P<space>[ \t\r\n]+)
+    |(?P<comment>//[^\n]*)
+    |(?P<number>[0-9]+(?:\.[0-9]+)?)
+    |(?P<identifier>[A-Za-z_][A-Za-z0-9_]*)
+    |(?P<string>"[^"]*")
+    |(?P<unterminated>"[^"]*)
+    |(?P<operator>[!=<>]=|[(){},.\-+;*/!=<>])
+    |(?P<unexpected>.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+
+class RegexScanner:
+    source: str
+    line: int
+
+    def __init__(self, source: str, line: int = 1):
+        self.source = source
+        self.line = line
+
+    def scan_tokens(self) -> list[Token]:
+        return list(self.iter_tokens())
+
+    def iter_tokens(self) -> Iterator[Token]:
+        line = self.line
+        for match in token_pattern.finditer(self.source):
+            kind = match.lastgroup
+            text = match.group()
+            if kind == "space":
+                line += text.count("\n")
+            elif kind == "identifier":
+                type = keywords.get(text, TokenType.IDENTIFIER)
+                yield Token(type, sys.intern(text), None, line)
+            elif kind == "operator":
+                yield Token(operators[text], sys.intern(text), None, line)
+            elif kind == "number":
+                yield Token(TokenType.NUMBER, text, float(text), line)
+            elif kind == "string":
+                line += text.count("\n")
+                yield Token(TokenType.STRING, text, sys.intern(text[1:-1]), line)
+            elif kind == "unterminated":
+                line += text.count("\n")
+                Lox.error_line(line, "Unterminated string.")
+            elif kind == "unexpected":
+                Lox.error_line(line, "Unexpected character.")
+        self.line = line
+        yield Token(TokenType.EOF, "", None, line)
@@ -0,0 +1,345 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import signal
+import time
+from collections import OrderedDict
+from multiprocessing.connection import Connection
+from typing import Any, Dict
+
+import program
+from lox import ENGINES
+
+# one json object per line in both directions. a request carries "source"
+# (and optionally "engine", "optimize", "globals", "timeout", "id"), or
+# "program" with the key returned by an earlier response to run it again
+# without sending the source. "timeout" is in seconds and may only shorten the
+# server's own. every response echoes "id" and has a "status" of ok,
+# compile_error, runtime_error, timeout, busy or error.
+
+# forked workers would inherit the pipes of the workers started before them
+# and never see EOF when the server goes away, the fork server starts each
+# one clean
+CONTEXT = multiprocessing.get_context("forkserver")
+# longest request line read, a longer one is answered with an error
+DEFAULT_MAX_REQUEST = 16 * 1024 * 1024
+
+
+def program_key(source: str, engine: str, optimize: bool) -> str:
+    digest = hashlib.sha256(f"{engine}:{optimize}:".encode())
+    digest.update(source.encode())
+    return digest.hexdigest()
+
+
+def evaluate(programs: OrderedDict, request: Dict[str, Any], cache_size: int) -> Dict:
+    key = request["key"]
+    timings = {}
+    start = time.perf_counter()
+    compiled = programs.get(key)
+    if compiled is None:
+        try:
+            compiled = program.compile(
+                request["source"], request["engine"], request["optimize"]
+            )
+        except program.CompileError as e:
+            return {"status": "compile_error", "errors": e.errors}
+        programs[key] = compiled
+        if len(programs) > cache_size:
+            programs.popitem(last=False)
+    else:
+        programs.move_to_end(key)
+    timings["compile"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = compiled.run(globals=request["globals"])
+    timings["run"] = time.perf_counter() - start
+
+    response = {"status": "ok", "output": result.output, "timings": timings}
+    if result.error is not None:
+        response["status"] = "runtime_error"
+        response["errors"] = [f"{result.error.message}\n[line {result.error.line}]"]
+    return response
+
+
+def worker_main(conn: Connection, cache_size: int):
+    # each worker keeps its own compiled programs, the server only routes
+    programs: OrderedDict = OrderedDict()
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+        try:
+            response = evaluate(programs, request, cache_size)
+        except Exception as e:
+            programs.pop(request["key"], None)
+            response = {"status": "error", "errors": [repr(e)]}
+        conn.send(response)
+
+
+class Worker:
+    process: multiprocessing.Process
+    conn: Connection
+
+    def __init__(self, cache_size: int):
+        self.conn, child = CONTEXT.Pipe()
+        self.process = CONTEXT.Process(
+            target=worker_main, args=(child, cache_size), daemon=True
+        )
+        self.process.start()
+        child.close()
+
+    def kill(self):
+        # the executor thread blocked in recv() sees EOF once the process is gone
+        self.process.kill()
+        self.process.join()
+
+
+class Server:
+    # requests beyond jobs + queue_size waiting or running are turned away
+    # with "busy" instead of piling up, a request running past its timeout
+    # has its worker killed and replaced
+    def __init__(
+        self,
+        jobs: int,
+        queue_size: int,
+        timeout: float,
+        cache_size: int,
+        max_request: int = DEFAULT_MAX_REQUEST,
+    ):
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.max_request = max_request
+        self.capacity = jobs + queue_size
+        self.pending = 0
+        self.sources: OrderedDict = OrderedDict()
+        self.workers = set()
+        self.idle: asyncio.Queue = asyncio.Queue()
+        for _ in range(jobs):
+            self.idle.put_nowait(self.start_worker())
+
+    def start_worker(self) -> Worker:
+        worker = Worker(self.cache_size)
+        self.workers.add(worker)
+        return worker
+
+    def kill_worker(self, worker: Worker):
+        worker.kill()
+        self.workers.discard(worker)
+
+    async def replace_worker(self, worker: Worker) -> Worker:
+        # joining the old process and starting a new one both block, keep
+        # them off the event loop
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.kill_worker, worker)
+        return await loop.run_in_executor(None, self.start_worker)
+
+    def shutdown(self):
+        for worker in list(self.workers):
+            self.kill_worker(worker)
+
+    def request_timeout(self, request: Dict[str, Any]) -> float:
+        timeout = request.get("timeout", self.timeout)
+        # bool is an int, nan is not > 0
+        if type(timeout) not in (int, float) or not timeout > 0:
+            raise ValueError(f"timeout must be a positive number, got {timeout!r}")
+        return min(timeout, self.timeout)
+
+    def prepare(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        if "program" in request:
+            key = request["program"]
+            if key not in self.sources:
+                raise ValueError(f"unknown program {key}")
+            self.sources.move_to_end(key)
+            source, engine, optimize = self.sources[key]
+        else:
+            source = request["source"]
+            engine = request.get("engine", "tree")
+            optimize = bool(request.get("optimize", False))
+            if engine not in ENGINES:
+                raise ValueError(f"unknown engine {engine}")
+            key = program_key(source, engine, optimize)
+            self.sources[key] = (source, engine, optimize)
+            if len(self.sources) > self.cache_size:
+                self.sources.popitem(last=False)
+        globals = request.get("globals")
+        if globals is not None:
+            # converted here too so a bad value is refused before it is queued
+            globals = program.lox_globals(globals)
+        return {
+            "key": key,
+            "source": source,
+            "engine": engine,
+            "optimize": optimize,
+            "globals": globals,
+        }
+
+    async def handle_request(self, request: Dict[str, Any]) -> Dict:
+        try:
+            timeout = self.request_timeout(request)
+            work = self.prepare(request)
+        except (KeyError, ValueError, TypeError, AttributeError) as e:
+            return {"status": "error", "errors": [str(e)]}
+        if self.pending >= self.capacity:
+            return {"status": "busy", "program": work["key"]}
+
+        self.pending += 1
+        queued = time.perf_counter()
+        worker = await self.idle.get()
+        waited = time.perf_counter() - queued
+        loop = asyncio.get_running_loop()
+        try:
+            worker.conn.send(work)
+            response = await asyncio.wait_for(
+                loop.run_in_executor(None, worker.conn.recv), timeout
+            )
+        except asyncio.TimeoutError:
+            # a runaway program cannot be interrupted from outside, only killed
+            response = {"status": "timeout", "errors": [f"exceeded {timeout}s"]}
+            worker = await self.replace_worker(worker)
+        except (EOFError, OSError) as e:
+            # the worker went away while running the program
+            response = {"status": "error", "errors": [f"worker failed: {e!r}"]}
+            worker = await self.replace_worker(worker)
+        finally:
+            self.idle.put_nowait(worker)
+            self.pending -= 1
+
+        response["program"] = work["key"]
+        response.setdefault("timings", {})["queue"] = waited
+        return response
+
+    async def send(self, response: Dict, writer: asyncio.StreamWriter):
+        writer.write(json.dumps(response).encode() + b"\n")
+        await writer.drain()
+
+    async def respond(self, line: bytes, writer: asyncio.StreamWriter):
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a json object")
+        except ValueError as e:
+            response = {"status": "error", "errors": [str(e)]}
+        else:
+            try:
+                response = await self.handle_request(request)
+            except Exception as e:
+                # whatever went wrong, the client still gets an answer
+                response = {"status": "error", "errors": [repr(e)]}
+            if "id" in request:
+                response["id"] = request["id"]
+        await self.send(response, writer)
+
+    async def read_request(self, reader: asyncio.StreamReader) -> bytes | None:
+        # the next line, empty at the end of the stream. a line over the
+        # limit is skipped up to its newline and gives None
+        try:
+            return await reader.readuntil(b"\n")
+        except asyncio.IncompleteReadError as e:
+            return e.partial
+        except asyncio.LimitOverrunError as e:
+            overrun = e
+        while True:
+            # what readuntil looked at is still buffered, drop it and look
+            # for the end of the line in what follows
+            await reader.readexactly(overrun.consumed)
+            try:
+                await reader.readuntil(b"\n")
+                return None
+            except asyncio.IncompleteReadError:
+                return None
+            except asyncio.LimitOverrunError as e:
+                overrun = e
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        # requests on one connection run concurrently, match responses by id
+        tasks = set()
+        try:
+            while (line := await self.read_request(reader)) != b"":
+                if line is None:
+                    response = {
+                        "status": "error",
+                        "errors": [f"request longer than {self.max_request} bytes"],
+                    }
+                    task = asyncio.create_task(self.send(response, writer))
+                elif not line.strip():
+                    continue
+                else:
+                    task = asyncio.create_task(self.respond(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except ConnectionError:
+            pass
+        finally:
+            # requests still running are answered before the connection
+            # closes, or fail quietly when the client has gone
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            writer.close()
+
+    async def serve(self, host: str | None, port: int | None, path: str | None):
+        if path is not None:
+            server = await asyncio.start_unix_server(
+                self.handle_connection, path, limit=self.max_request
+            )
+        else:
+            server = await asyncio.start_server(
+                self.handle_connection, host, port, limit=self.max_request
+            )
+        for sock in server.sockets:
+            print(f"listening on {sock.getsockname()}", flush=True)
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, server.close)
+        async with server:
+            try:
+                await server.serve_forever()
+            except asyncio.CancelledError:
+                pass
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve Lox evaluations as json lines over a local socket."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7878)
+    parser.add_argument("--unix", metavar="PATH", help="listen on a unix socket")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count())
+    parser.add_argument(
+        "--queue", type=int, default=64, help="requests allowed to wait for a worker"
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=5.0,
+        help="default and longest seconds per request",
+    )
+    parser.add_argument(
+        "--cache-size", type=int, default=256, help="compiled programs kept per worker"
+    )
+    parser.add_argument(
+        "--max-request",
+        type=int,
+        default=DEFAULT_MAX_REQUEST,
+        metavar="BYTES",
+        help="longest request line accepted",
+    )
+    args = parser.parse_args()
+
+    server = Server(
+        args.jobs, args.queue, args.timeout, args.cache_size, args.max_request
+    )
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,432 @@
+import operator
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+import expr
+import quickening
+import stmt
+from environment import Environment
+from interpreter import Interpreter
+from output import Output
+from profiler import node_line
+from quickening import base_class
+from resolver import loop_scope
+from runtimeerror import RuntimeError
+
+# pending frames, about one per level of nesting being evaluated
+DEFAULT_MAX_DEPTH = 10000
+
+# keyed by lexeme, hashing a TokenType member goes through python code
+NUMBER_OPERATORS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+
+# what simple() gives for an expression that has to go through frames
+PENDING = object()
+# python frames simple() may nest, the only recursion in the engine
+SIMPLE_DEPTH = 16
+
+# statements whose handlers never run another statement, they are called
+# directly instead of going through a frame. a block also runs an if in
+# place, the branches of an if only run these, so neither can recurse
+IN_PLACE = {stmt.Expression, stmt.Print, stmt.Var}
+
+Handler = Callable[[Any], None]
+# a loop, the block whose scope it hoisted (or None), the statements after
+# that block and the hoisted environment
+LoopState = Tuple[stmt.While, stmt.Block | None, List[stmt.Stmt], Environment | None]
+
+
+def specializing(base: type) -> frozenset:
+    # base and every quickened class the Interpreter may turn it into
+    return frozenset(
+        cls
+        for cls in vars(quickening).values()
+        if isinstance(cls, type) and base_class(cls) is base
+    )
+
+
+# a tree the Interpreter ran holds its quickened nodes, simple() evaluates
+# them as the class they specialize
+BINARIES = specializing(expr.Binary)
+UNARIES = specializing(expr.Unary)
+
+
+class Handlers(dict):
+    # node classes the table does not know, such as quickened nodes left by
+    # another engine, run like the class they specialize
+    def __missing__(self, cls: type) -> Handler:
+        for base in cls.__mro__[1:]:
+            if base in self:
+                self[cls] = self[base]
+                return self[cls]
+        raise TypeError(f"no handler for {cls.__name__}")
+
+
+class StackInterpreter(Interpreter):
+    # walks the same tree as the Interpreter without python recursion. work
+    # holds continuation frames, a handler and what it applies to, and
+    # expressions leave their result on the values stack. nesting costs list
+    # entries instead of python frames, and going past max_depth pending
+    # frames is a lox runtime error rather than a RecursionError.
+    # expressions that would run next anyway are computed in place by
+    # simple() when they are shallow and assign nothing, most expressions
+    # never get a frame of their own
+    max_depth: int
+    work: List[Tuple[Handler, Any]]
+    values: List[Any]
+
+    def __init__(self, output: Output | None = None, max_depth: int = DEFAULT_MAX_DEPTH):
+        super().__init__(output)
+        self.max_depth = max_depth
+        self.work = []
+        self.values = []
+        self.handlers: Dict[type, Handler] = Handlers(
+            {
+                expr.Literal: self.literal,
+                expr.Variable: self.variable,
+                expr.Grouping: self.grouping,
+                expr.Binary: self.binary,
+                expr.Logical: self.logical,
+                expr.Unary: self.unary,
+                expr.Assign: self.assign,
+                stmt.Expression: self.expression_statement,
+                stmt.Print: self.print_statement,
+                stmt.Var: self.var_statement,
+                stmt.Block: self.block,
+                stmt.If: self.if_statement,
+                stmt.While: self.while_statement,
+            }
+        )
+
+    def run(self, statements: List[stmt.Stmt]):
+        work = self.work
+        pop = work.pop
+        max_depth = self.max_depth
+        try:
+            for statement in statements:
+                self.push(statement)
+                while 0 < len(work) <= max_depth:
+                    handler, node = pop()
+                    handler(node)
+                if work:
+                    raise self.overflow()
+        finally:
+            # a runtime error leaves frames behind, the next run starts clean
+            work.clear()
+            self.values.clear()
+            self.environment = self.globals
+
+    def push(self, node: expr.Expr | stmt.Stmt):
+        self.work.append((self.handlers[node.__class__], node))
+
+    def overflow(self) -> RuntimeError:
+        line = None
+        for _, pending in reversed(self.work):
+            line = node_line(pending)
+            if line is not None:
+                break
+        return RuntimeError(None, "Stack overflow.", line)
+
+    def read(self, node: expr.Variable) -> Any:
+        depth = node.depth
+        if depth is None:
+            return self.globals.get(node.name)
+        environment = self.environment
+        while depth:
+            environment = environment.enclosing
+            depth -= 1
+        return environment.values[node.slot]
+
+    def simple(self, node: expr.Expr, budget: int = SIMPLE_DEPTH) -> Any:
+        # evaluates an expression with no assignment in it and at most budget
+        # levels deep right here, with python recursion bounded by the budget.
+        # giving up halfway is harmless: nothing was written, and a runtime
+        # error raised on the way is the one the frames would raise first
+        cls = node.__class__
+        if cls is expr.Literal:
+            return node.value
+        if cls is expr.Variable:
+            return self.read(node)
+        if not budget:
+            return PENDING
+        budget -= 1
+        if cls in BINARIES:
+            # most operands are literals or variables, read them without a call
+            left = node.left
+            cls = left.__class__
+            if cls is expr.Literal:
+                a = left.value
+            elif cls is expr.Variable:
+                a = self.read(left)
+            else:
+                a = self.simple(left, budget)
+                if a is PENDING:
+                    return PENDING
+            right = node.right
+            cls = right.__class__
+            if cls is expr.Literal:
+                b = right.value
+            elif cls is expr.Variable:
+                b = self.read(right)
+            else:
+                b = self.simple(right, budget)
+                if b is PENDING:
+                    return PENDING
+            number = NUMBER_OPERATORS.get(node.operator.lexeme)
+            if number is not None and a.__class__ is float and b.__class__ is float:
+                return number(a, b)
+            return self.binary_operation(node, a, b)
+        if cls is expr.Grouping:
+            return self.simple(node.expression, budget)
+        if cls in UNARIES:
+            right = self.simple(node.right, budget)
+            if right is PENDING:
+                return PENDING
+            return self.unary_operation(node, right)
+        if cls is expr.Logical:
+            left = self.simple(node.left, budget)
+            if left is PENDING:
+                return PENDING
+            if node.operator.lexeme == "or":
+                if left is not None and left is not False:
+                    return left
+            elif left is None or left is False:
+                return left
+            return self.simple(node.right, budget)
+        return PENDING
+
+    def operate(self, node: expr.Binary, a: Any, b: Any) -> Any:
+        number = NUMBER_OPERATORS.get(node.operator.lexeme)
+        if number is not None and a.__class__ is float and b.__class__ is float:
+            return number(a, b)
+        return self.binary_operation(node, a, b)
+
+    def then(self, continuation: Handler, node: Any, operand: expr.Expr):
+        # runs continuation on node once operand has left its value
+        value = self.simple(operand)
+        if value is PENDING:
+            self.work.append((continuation, node))
+            self.push(operand)
+            return
+        self.values.append(value)
+        continuation(node)
+
+    def literal(self, node: expr.Literal):
+        self.values.append(node.value)
+
+    def variable(self, node: expr.Variable):
+        self.values.append(self.read(node))
+
+    def grouping(self, node: expr.Grouping):
+        self.push(node.expression)
+
+    def binary(self, node: expr.Binary):
+        self.then(self.binary_right, node, node.left)
+
+    def binary_right(self, node: expr.Binary):
+        value = self.simple(node.right)
+        if value is PENDING:
+            self.work.append((self.apply_binary, node))
+            self.push(node.right)
+            return
+        values = self.values
+        values[-1] = self.operate(node, values[-1], value)
+
+    def apply_binary(self, node: expr.Binary):
+        values = self.values
+        right = values.pop()
+        values[-1] = self.operate(node, values[-1], right)
+
+    def logical(self, node: expr.Logical):
+        self.then(self.logical_right, node, node.left)
+
+    def logical_right(self, node: expr.Logical):
+        left = self.values[-1]
+        if node.operator.lexeme == "or":
+            if self.is_true(left):
+                return
+        elif not self.is_true(left):
+            return
+        self.values.pop()
+        value = self.simple(node.right)
+        if value is PENDING:
+            self.push(node.right)
+        else:
+            self.values.append(value)
+
+    def unary(self, node: expr.Unary):
+        self.then(self.apply_unary, node, node.right)
+
+    def apply_unary(self, node: expr.Unary):
+        values = self.values
+        values[-1] = self.unary_operation(node, values[-1])
+
+    def assign(self, node: expr.Assign):
+        value = self.simple(node.value)
+        if value is PENDING:
+            self.work.append((self.store, node))
+            self.push(node.value)
+            return
+        self.values.append(value)
+        self.write_variable(node, value)
+
+    def store(self, node: expr.Assign):
+        # the value stays on the stack, assignment is an expression
+        self.write_variable(node, self.values[-1])
+
+    def write_variable(self, node: expr.Assign, value: Any):
+        depth = node.depth
+        if depth is None:
+            self.globals.assign(node.name, value)
+            return
+        environment = self.environment
+        while depth:
+            environment = environment.enclosing
+            depth -= 1
+        environment.values[node.slot] = value
+
+    def expression_statement(self, node: stmt.Expression):
+        expression = node.expression
+        if expression.__class__ is expr.Assign:
+            # the usual statement, its value is not needed
+            value = self.simple(expression.value)
+            if value is PENDING:
+                self.work.append((self.discard, node))
+                self.work.append((self.store, expression))
+                self.push(expression.value)
+            else:
+                self.write_variable(expression, value)
+            return
+        self.then(self.discard, node, expression)
+
+    def discard(self, node: stmt.Expression):
+        self.values.pop()
+
+    def print_statement(self, node: stmt.Print):
+        value = self.simple(node.expression)
+        if value is PENDING:
+            self.work.append((self.write, node))
+            self.push(node.expression)
+            return
+        self.output.print(value)
+
+    def write(self, node: stmt.Print):
+        self.output.print(self.values.pop())
+
+    def var_statement(self, node: stmt.Var):
+        value = None
+        if node.initializer is not None:
+            value = self.simple(node.initializer)
+            if value is PENDING:
+                self.work.append((self.define, node))
+                self.push(node.initializer)
+                return
+        self.define_variable(node, value)
+
+    def define(self, node: stmt.Var):
+        self.define_variable(node, self.values.pop())
+
+    def define_variable(self, node: stmt.Var, value: Any):
+        if node.slot is None:
+            self.globals.define(node.name.lexeme, value)
+        else:
+            self.environment.values[node.slot] = value
+
+    def block(self, node: stmt.Block):
+        if node.size:
+            # the scope is left by a frame of its own, pushed under the body
+            self.work.append((self.leave, self.environment))
+            self.environment = Environment(self.environment, node.size)
+        self.next_statement(iter(node.statements))
+
+    def execute_statement(self, statement: stmt.Stmt):
+        cls = statement.__class__
+        if cls in IN_PLACE:
+            self.handlers[cls](statement)
+        else:
+            self.push(statement)
+
+    def next_statement(self, statements: Iterator[stmt.Stmt]):
+        # runs statements one after the other as long as they finish in
+        # place. the first one that leaves frames gets the rest of the walk
+        # pushed under them, so a block is one frame deep whatever its length
+        work = self.work
+        height = len(work)
+        for statement in statements:
+            if statement.__class__ is stmt.If:
+                self.if_statement(statement)
+            else:
+                self.execute_statement(statement)
+            if len(work) != height:
+                work.insert(height, (self.next_statement, statements))
+                return
+
+    def leave(self, environment: Environment):
+        self.environment = environment
+
+    def if_statement(self, node: stmt.If):
+        value = self.simple(node.condition)
+        if value is PENDING:
+            self.work.append((self.branch, node))
+            self.push(node.condition)
+            return
+        self.take_branch(node, value)
+
+    def branch(self, node: stmt.If):
+        self.take_branch(node, self.values.pop())
+
+    def take_branch(self, node: stmt.If, condition: Any):
+        if condition is not None and condition is not False:
+            self.execute_statement(node.then_branch)
+        elif node.else_branch is not None:
+            self.execute_statement(node.else_branch)
+
+    def while_statement(self, node: stmt.While):
+        block, rest = loop_scope(node.body)
+        scope = None
+        if block is not None:
+            # one environment for every iteration, as in the other engines
+            scope = Environment(self.environment, block.size)
+        self.loop((node, block, rest, scope))
+
+    def loop(self, state: LoopState):
+        # the condition is tested in place when it is simple, otherwise
+        # through a frame, never by calling back into loop
+        value = self.simple(state[0].condition)
+        if value is PENDING:
+            self.work.append((self.loop_test, state))
+            self.push(state[0].condition)
+        elif value is not None and value is not False:
+            self.iteration(state)
+
+    def loop_test(self, state: LoopState):
+        if self.is_true(self.values.pop()):
+            self.iteration(state)
+
+    def iteration(self, state: LoopState):
+        node, block, rest, scope = state
+        self.work.append((self.loop, state))
+        if block is None:
+            body = node.body
+            if body.__class__ is stmt.Block and not body.size:
+                self.next_statement(iter(body.statements))
+            else:
+                self.push(body)
+            return
+        self.work.append((self.end_iteration, state))
+        self.environment = scope
+        self.next_statement(iter(block.statements))
+
+    def end_iteration(self, state: LoopState):
+        # back in the loop's environment, which encloses the hoisted one
+        _, _, rest, scope = state
+        self.environment = scope.enclosing
+        if rest:
+            self.next_statement(iter(rest))
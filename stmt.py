@@ -39,20 +39,25 @@ class Visitor(ABC, Generic[T]):
 
 
 class Stmt(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def accept(self, visitor: Visitor):
         pass
 
 
-@dataclass
+@dataclass(slots=True)
 class Block(Stmt):
     statements: List[Stmt]
+    size: int = 0
+    # the closing brace, None for blocks the front end made up
+    end: Token | None = None
 
     def accept(self, visitor: Visitor):
         return visitor.visit_block_stmt(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class Expression(Stmt):
     expression: Expr
 
@@ -60,24 +65,26 @@ class Expression(Stmt):
         return visitor.visit_expression_stmt(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class Print(Stmt):
     expression: Expr
+    keyword: Token | None = None
 
     def accept(self, visitor: Visitor):
         return visitor.visit_print_stmt(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class Var(Stmt):
     name: Token | None
     initializer: Expr | None
+    slot: int | None = None
 
     def accept(self, visitor: Visitor):
         return visitor.visit_var_stmt(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class If(Stmt):
     condition: Expr
     then_branch: Stmt
@@ -86,10 +93,12 @@ class If(Stmt):
     def accept(self, visitor: Visitor):
         return visitor.visit_if_stmt(self)
 
-@dataclass
+@dataclass(slots=True)
 class While(Stmt):
     condition: Expr
     body: Stmt
+    # the last token of the body
+    end: Token | None = None
 
     def accept(self, visitor: Visitor):
         return visitor.visit_while_stmt(self)
@@ -22,7 +22,7 @@ class TokenType(Enum):
     LESS_EQUAL    = 18
     IDENTIFIER    = 19
     STRING        = 20
-    NUMBER        = 22
+    NUMBER        = 21
     AND           = 22
     CLASS         = 23
     ELSE          = 24
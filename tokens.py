@@ -1,20 +1,78 @@
+import sys
 import typing
+from array import array
+from bisect import bisect_right
 from token_type import TokenType
 from dataclasses import dataclass
 
-@dataclass
+@dataclass(slots=True)
 class Token:
     type: TokenType
     lexeme: str
     literal: typing.Any
-    line: int 
-
-    def __init__(self, type: TokenType, lexeme: str, literal: object | None, line: int):
-        self.type = type
-        self.lexeme = lexeme
-        self.literal = literal
-        self.line = line
-    
+    line: int
+
     def __str__(self):
         return f'{self.type} {self.lexeme} {self.literal}'
 
+
+TOKEN_TYPES = [None] * (max(t.value for t in TokenType) + 1)
+for token_type in TokenType:
+    TOKEN_TYPES[token_type.value] = token_type
+
+
+class TokenBuffer:
+    # struct of arrays token store: one byte per type, one interned lexeme per
+    # token, literals recomputed from the lexeme and lines kept run-length
+    # encoded as (first token index, line) pairs
+    __slots__ = ("types", "lexemes", "line_starts", "lines", "cache")
+
+    types: array
+    lexemes: typing.List[str]
+    line_starts: array
+    lines: array
+    cache: typing.List[typing.Tuple[int, Token | None]]
+
+    def __init__(self, tokens: typing.Iterable[Token] = ()):
+        self.types = array("B")
+        self.lexemes = []
+        self.line_starts = array("I")
+        self.lines = array("I")
+        # the parser alternates between peek() and previous(), one cache entry
+        # per index parity keeps both materialized
+        self.cache = [(-1, None), (-1, None)]
+        for token in tokens:
+            self.append(token)
+
+    def append(self, token: Token):
+        index = len(self.types)
+        if len(self.lines) == 0 or self.lines[-1] != token.line:
+            self.line_starts.append(index)
+            self.lines.append(token.line)
+        self.types.append(token.type.value)
+        self.lexemes.append(sys.intern(token.lexeme))
+
+    def line_at(self, index: int) -> int:
+        return self.lines[bisect_right(self.line_starts, index) - 1]
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __getitem__(self, index: int) -> Token:
+        if index < 0:
+            index += len(self.types)
+        cached_index, token = self.cache[index & 1]
+        if cached_index == index:
+            return typing.cast(Token, token)
+
+        type = TOKEN_TYPES[self.types[index]]
+        lexeme = self.lexemes[index]
+        literal = None
+        if type is TokenType.NUMBER:
+            literal = float(lexeme)
+        elif type is TokenType.STRING:
+            # interned like the scanner's, equal strings compare by identity
+            literal = sys.intern(lexeme[1:-1])
+        token = Token(type, lexeme, literal, self.line_at(index))
+        self.cache[index & 1] = (index, token)
+        return token
@@ -0,0 +1,180 @@
+from typing import Any
+from typing import List
+
+import stmt
+from chunk import Chunk
+from chunk import OpCode
+from compiler import Compiler
+from environment import GlobalEnvironment
+from lox import Lox
+from output import Output
+from rope import STRING_TYPES
+from rope import concat
+from rope import strings_equal
+from runtimeerror import RuntimeError
+
+# plain ints so the dispatch loop compares against fast locals
+OP_CONSTANT = OpCode.CONSTANT.value
+OP_NIL = OpCode.NIL.value
+OP_TRUE = OpCode.TRUE.value
+OP_FALSE = OpCode.FALSE.value
+OP_POP = OpCode.POP.value
+OP_GET_LOCAL = OpCode.GET_LOCAL.value
+OP_SET_LOCAL = OpCode.SET_LOCAL.value
+OP_GET_GLOBAL = OpCode.GET_GLOBAL.value
+OP_DEFINE_GLOBAL = OpCode.DEFINE_GLOBAL.value
+OP_SET_GLOBAL = OpCode.SET_GLOBAL.value
+OP_EQUAL = OpCode.EQUAL.value
+OP_NOT_EQUAL = OpCode.NOT_EQUAL.value
+OP_GREATER = OpCode.GREATER.value
+OP_GREATER_EQUAL = OpCode.GREATER_EQUAL.value
+OP_LESS = OpCode.LESS.value
+OP_LESS_EQUAL = OpCode.LESS_EQUAL.value
+OP_ADD = OpCode.ADD.value
+OP_SUBTRACT = OpCode.SUBTRACT.value
+OP_MULTIPLY = OpCode.MULTIPLY.value
+OP_DIVIDE = OpCode.DIVIDE.value
+OP_NOT = OpCode.NOT.value
+OP_NEGATE = OpCode.NEGATE.value
+OP_PRINT = OpCode.PRINT.value
+OP_JUMP = OpCode.JUMP.value
+OP_JUMP_IF_FALSE = OpCode.JUMP_IF_FALSE.value
+OP_LOOP = OpCode.LOOP.value
+OP_RETURN = OpCode.RETURN.value
+
+NUMBER_OPERATORS = {
+    OP_GREATER: float.__gt__,
+    OP_GREATER_EQUAL: float.__ge__,
+    OP_LESS: float.__lt__,
+    OP_LESS_EQUAL: float.__le__,
+    OP_SUBTRACT: float.__sub__,
+    OP_MULTIPLY: float.__mul__,
+    OP_DIVIDE: float.__truediv__,
+}
+
+
+class VM:
+    globals: GlobalEnvironment
+    stack: List[Any]
+    output: Output
+
+    def __init__(self, output: Output | None = None):
+        self.globals = GlobalEnvironment()
+        self.stack = []
+        self.output = output or Output()
+
+    def compile(self, statements: List[stmt.Stmt]) -> Chunk | None:
+        return Compiler().compile(statements)
+
+    def interpret(self, statements: List[stmt.Stmt]):
+        chunk = self.compile(statements)
+        if chunk is None:
+            return
+        try:
+            self.run(chunk)
+        except (RuntimeError) as e:
+            self.output.flush()
+            Lox.runtime_error(e)
+
+    def run(self, chunk: Chunk):
+        code = chunk.code
+        lines = chunk.lines
+        constants = chunk.constants
+        globals = self.globals.values
+        write = self.output.print
+        stack = self.stack = []
+        push = stack.append
+        pop = stack.pop
+        ip = 0
+
+        while True:
+            instruction = code[ip]
+            ip += 1
+
+            if instruction == OP_GET_LOCAL:
+                push(stack[code[ip]])
+                ip += 1
+            elif instruction == OP_CONSTANT:
+                push(constants[code[ip]])
+                ip += 1
+            elif instruction == OP_POP:
+                pop()
+            elif instruction == OP_SET_LOCAL:
+                stack[code[ip]] = stack[-1]
+                ip += 1
+            elif instruction == OP_GET_GLOBAL:
+                name = constants[code[ip]]
+                ip += 1
+                if name not in globals:
+                    raise self.error(chunk, ip, f'Undefined variable "{name}".')
+                push(globals[name])
+            elif instruction == OP_SET_GLOBAL:
+                name = constants[code[ip]]
+                ip += 1
+                if name not in globals:
+                    raise self.error(chunk, ip, f'Undefined variable "{name}".')
+                globals[name] = stack[-1]
+            elif instruction == OP_JUMP_IF_FALSE:
+                value = stack[-1]
+                if value is None or value is False:
+                    ip += (code[ip] << 8) | code[ip + 1]
+                ip += 2
+            elif instruction == OP_LOOP:
+                ip -= ((code[ip] << 8) | code[ip + 1]) - 2
+            elif instruction == OP_JUMP:
+                ip += ((code[ip] << 8) | code[ip + 1]) + 2
+            elif instruction == OP_ADD:
+                b = pop()
+                a = stack[-1]
+                if a.__class__ is float and b.__class__ is float:
+                    stack[-1] = a + b
+                elif a.__class__ in STRING_TYPES and b.__class__ in STRING_TYPES:
+                    stack[-1] = concat(a, b)
+                else:
+                    raise self.error(
+                        chunk, ip, "Operands must be two numbers or two strings."
+                    )
+            elif instruction in NUMBER_OPERATORS:
+                b = pop()
+                a = stack[-1]
+                if a.__class__ is not float or b.__class__ is not float:
+                    raise self.error(chunk, ip, "Operands must be numbers.")
+                stack[-1] = NUMBER_OPERATORS[instruction](a, b)
+            elif instruction == OP_EQUAL:
+                b = pop()
+                a = stack[-1]
+                if a.__class__ is b.__class__:
+                    stack[-1] = a == b
+                else:
+                    stack[-1] = strings_equal(a, b)
+            elif instruction == OP_NOT_EQUAL:
+                b = pop()
+                a = stack[-1]
+                if a.__class__ is b.__class__:
+                    stack[-1] = a != b
+                else:
+                    stack[-1] = not strings_equal(a, b)
+            elif instruction == OP_NIL:
+                push(None)
+            elif instruction == OP_TRUE:
+                push(True)
+            elif instruction == OP_FALSE:
+                push(False)
+            elif instruction == OP_NOT:
+                value = stack[-1]
+                stack[-1] = value is None or value is False
+            elif instruction == OP_NEGATE:
+                value = stack[-1]
+                if value.__class__ is not float:
+                    raise self.error(chunk, ip, "Operand must be a number.")
+                stack[-1] = -value
+            elif instruction == OP_PRINT:
+                write(pop())
+            elif instruction == OP_DEFINE_GLOBAL:
+                globals[constants[code[ip]]] = pop()
+                ip += 1
+            elif instruction == OP_RETURN:
+                return
+
+    def error(self, chunk: Chunk, ip: int, message: str) -> RuntimeError:
+        return RuntimeError(None, message, chunk.lines[ip - 1])